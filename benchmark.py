@@ -0,0 +1,54 @@
+if __name__ == '__main__':
+    import argparse
+    import os
+    import shutil
+    import sys
+    import tempfile
+
+    from homework_server import create_app, db
+    from homework_server.benchmark import compare, format_results, load_baseline, run_benchmark, save_baseline
+    from homework_server.dataset import SCALES, generate_dataset
+
+    parser = argparse.ArgumentParser(description='Benchmark every API route against a generated dataset.')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--database', default='sqlite://')
+    parser.add_argument('--route', action='append', help='only run this endpoint (repeatable)')
+    parser.add_argument('--baseline', default='benchmark_baseline.json',
+                        help='machine-specific results to compare against, written by --save-baseline; '
+                             'generate it locally, it is not committed')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    upload_folder = tempfile.mkdtemp()
+    app = create_app(os.environ.get('CONFIG', 'testing'))
+    app.config.update({
+        'SECRET_KEY': app.config['SECRET_KEY'] or 'benchmark',
+        'SQLALCHEMY_DATABASE_URI': args.database,
+        'UPLOAD_FOLDER': upload_folder,
+        'JOBS_MODE': 'manual'
+    })
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        counts = generate_dataset(args.scale, args.seed)
+        print(', '.join(f'{name}: {count}' for name, count in sorted(counts.items())))
+
+        results = run_benchmark(app, args.iterations, args.route)
+
+    shutil.rmtree(upload_folder)
+
+    baseline = load_baseline(args.baseline)
+    print(format_results(results, baseline))
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f'baseline saved to {args.baseline}')
+    elif baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for endpoint, metric, expected, actual in regressions:
+            print(f'REGRESSION {endpoint}: {metric} {expected} -> {actual}')
+        sys.exit(1 if regressions else 0)
@@ -6,6 +6,61 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER')
     MAX_CONTENT_LENGTH = os.environ.get('MAX_FILE_SIZE_MB', 16) * 1024 * 1024
+    BULK_IMPORT_WORKERS = int(os.environ.get('BULK_IMPORT_WORKERS', os.cpu_count() or 1))
+    BULK_IMPORT_CHUNK_SIZE = int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', 500))
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get('DATABASE_REPLICA_URIS', '').split(',') if uri]
+    REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+    REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get('REPLICA_HEALTH_CHECK_INTERVAL', 10))
+    JOBS_MODE = os.environ.get('JOBS_MODE', 'thread')
+    PURGE_CHUNK_SIZE = int(os.environ.get('PURGE_CHUNK_SIZE', 500))
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '').lower() in ['1', 'true', 'yes']
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ['SLOW_QUERY_THRESHOLD_MS']) if os.environ.get('SLOW_QUERY_THRESHOLD_MS') else None
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ['1', 'true', 'yes']
+    SERVER_WORKERS = 1
+    RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'local')
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+    RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR', 'cache')
+    RESPONSE_CACHE_REDIS_HOST = os.environ.get('RESPONSE_CACHE_REDIS_HOST', 'localhost')
+    RESPONSE_CACHE_REDIS_PORT = int(os.environ.get('RESPONSE_CACHE_REDIS_PORT', 6379))
+    REQUEST_COALESCING = os.environ.get('REQUEST_COALESCING', 'true').lower() in ['1', 'true', 'yes']
+    REQUEST_COALESCING_TIMEOUT = float(os.environ.get('REQUEST_COALESCING_TIMEOUT', 5))
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ['1', 'true', 'yes']
+    RATE_LIMIT_RATE = float(os.environ.get('RATE_LIMIT_RATE', 10))
+    RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 50))
+    RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 10000))
+    RATE_LIMIT_COSTS = {
+        'auth_api.get_token': 5,
+        'student_api.submit_solution': 10,
+        'admin_api.create_teachers_bulk': 20,
+        'admin_api.create_students_bulk': 20
+    }
+    LOAD_SHED_QUEUE_MS = float(os.environ['LOAD_SHED_QUEUE_MS']) if os.environ.get('LOAD_SHED_QUEUE_MS') else None
+    LOAD_SHED_RETRY_AFTER = float(os.environ.get('LOAD_SHED_RETRY_AFTER', 1))
+    DATABASE_ENGINE_PROFILES = {
+        'sqlite': {
+            'pool': {
+                'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', 5)),
+                'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', 10)),
+                'pool_timeout': 30
+            },
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'temp_store': 'MEMORY'
+            }
+        },
+        'default': {
+            'pool': {
+                'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', 10)),
+                'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', 20)),
+                'pool_timeout': 30,
+                'pool_recycle': 1800,
+                'pool_pre_ping': True
+            }
+        }
+    }
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -17,6 +72,10 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite://'
     UPLOAD_FOLDER = 'uploads'
     TESTING = True
+    BULK_IMPORT_WORKERS = 1
+    SQLALCHEMY_REPLICA_URIS = []
+    JOBS_MODE = 'eager'
+    RATE_LIMIT_ENABLED = False
 
 config = {
     'development': DevelopmentConfig,
@@ -1,23 +1,50 @@
+from time import perf_counter
+
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from .engine import Database
+
+db = Database()
 
 from config import config
 from .api.v1.auth import auth_api
 from .api.v1.admin import admin_api
 from .api.v1.teacher import teacher_api
 from .api.v1.student import student_api
+from .api.v1.search import search_api
+from .cache import init_cache
+from .cli import register_commands
+from .coalescing import init_coalescing
+from .instrumentation import init_instrumentation
+from .metrics import init_metrics
+from .ratelimit import init_rate_limiting
+from .jobs import init_jobs
+from .replicas import init_replicas
 
-def create_app(config_name):
+def create_app(config_name, **overrides):
+    start = perf_counter()
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config.update(overrides)
 
     db.init_app(app)
+    with app.app_context():
+        db.get_engine(app)
+        init_replicas(app, db)
+    init_jobs(app)
+    init_instrumentation(app)
+    init_metrics(app, db)
+    init_cache(app)
+    init_coalescing(app)
+    init_rate_limiting(app)
 
     app.register_blueprint(auth_api, url_prefix='/api/v1/auth')
     app.register_blueprint(admin_api, url_prefix='/api/v1/admin')
     app.register_blueprint(teacher_api, url_prefix='/api/v1/teacher')
     app.register_blueprint(student_api, url_prefix='/api/v1/student')
+    app.register_blueprint(search_api, url_prefix='/api/v1/search')
+
+    register_commands(app)
 
+    app.extensions['startup_seconds'] = perf_counter() - start
     return app
\ No newline at end of file
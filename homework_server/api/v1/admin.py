@@ -2,6 +2,8 @@ from flask import Blueprint, jsonify, request, url_for
 
 from .auth import check_user, token_auth
 from homework_server import db
+from homework_server.bulk import import_users, parse_import
+from homework_server.metrics import get_metrics
 from homework_server.models import Administrator, Teacher, Student
 from homework_server.pagination import PaginatedQuery
 
@@ -37,6 +39,15 @@ def create_teacher():
     db.session.commit()
     return '', 200
 
+@admin_api.route('/teachers/bulk', methods=['POST'])
+@token_auth.login_required
+@check_user(Administrator)
+def create_teachers_bulk():
+    rows = parse_import(request, 'teachers')
+    if rows is None:
+        return '', 400
+    return jsonify(import_users(Teacher, rows))
+
 @admin_api.route('/teacher/<int:id>', methods=['DELETE'])
 @token_auth.login_required
 @check_user(Administrator)
@@ -78,6 +89,15 @@ def create_studetns():
     db.session.commit()
     return '', 200
 
+@admin_api.route('/students/bulk', methods=['POST'])
+@token_auth.login_required
+@check_user(Administrator)
+def create_students_bulk():
+    rows = parse_import(request, 'students')
+    if rows is None:
+        return '', 400
+    return jsonify(import_users(Student, rows))
+
 @admin_api.route('/student/<int:id>', methods=['DELETE'])
 @token_auth.login_required
 @check_user(Administrator)
@@ -87,4 +107,16 @@ def remove_student(id):
         return '', 410
     db.session.delete(student)
     db.session.commit()
-    return '', 200
\ No newline at end of file
+    return '', 200
+
+@admin_api.route('/database/pool', methods=['GET'])
+@token_auth.login_required
+@check_user(Administrator)
+def get_pool_statistics():
+    return jsonify(db.pool_statistics())
+
+@admin_api.route('/metrics', methods=['GET'])
+@token_auth.login_required
+@check_user(Administrator)
+def get_metrics_text():
+    return get_metrics().render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
\ No newline at end of file
@@ -5,6 +5,7 @@ from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth
 
 from homework_server import db
 from homework_server.models import User
+from homework_server.ratelimit import address_key, limit_rate, user_key
 
 auth_api = Blueprint('auth_api', __name__)
 
@@ -13,6 +14,7 @@ token_auth = HTTPTokenAuth()
 
 @basic_auth.verify_password
 def verify_password(username, password):
+    limit_rate(address_key())
     user = User.query.filter_by(username=username).first()
     if user is None:
         return False
@@ -26,6 +28,7 @@ def basic_auth_error():
 @token_auth.verify_token
 def verify_token(token):
     g.current_user = User.check_token(token) if token else None
+    limit_rate(address_key() if g.current_user is None else user_key(g.current_user))
     return g.current_user is not None
 
 @token_auth.error_handler
@@ -0,0 +1,29 @@
+from flask import Blueprint, g, jsonify, request
+
+from .auth import token_auth
+from homework_server.pagination import PaginatedQuery
+from homework_server.search import search_query, search_result, search_terms
+
+search_api = Blueprint('search_api', __name__)
+
+@search_api.route('', methods=['GET'])
+@token_auth.login_required
+def search():
+    text = request.args.get('q', '')
+    if not search_terms(text):
+        return '', 400
+    start = request.args.get('start', 1, type=int)
+    limit = request.args.get('limit', 25, type=int)
+    query = search_query(text, g.current_user)
+    paginate = PaginatedQuery(
+        query,
+        query.order_by(None).count(),
+        'search_api.search',
+        'results',
+        start,
+        limit,
+        {'q': text},
+        search_result
+    )
+    result = paginate.execute()
+    return jsonify(result)
\ No newline at end of file
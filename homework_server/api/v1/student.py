@@ -5,20 +5,25 @@ from werkzeug.utils import secure_filename
 
 from .auth import check_user, token_auth
 from homework_server import db
-from homework_server.models import Course, Homework, Solution, Student
-from homework_server.pagination import PaginatedQuery
+from homework_server.cache import cached
+from homework_server.coalescing import coalesce
+from homework_server.models import (Course, HeadcountExceeded, Homework, Solution, Student, Teacher,
+                                    students_courses_table, students_homeworks_table)
+from homework_server.pagination import PaginatedQuery, paginate_window
 
 student_api = Blueprint('student_api', __name__)
 
 @student_api.route('/courses/all', methods=['GET'])
 @token_auth.login_required
 @check_user(Student)
+@cached(Course, Teacher)
 def get_courses():
     start = request.args.get('start', 1, type=int)
     limit = request.args.get('limit', 25, type=int)
+    base_query = Course.query.filter(Course.deleted_at.is_(None))
     paginate = PaginatedQuery(
-        Course.query.order_by(Course.name),
-        Course.query.count(),
+        base_query.order_by(Course.name),
+        base_query.count(),
         'student_api.get_courses',
         'courses',
         start,
@@ -34,7 +39,7 @@ def get_applied_courses():
     start = request.args.get('start', 1, type=int)
     limit = request.args.get('limit', 25, type=int)
     base_query = Course.query.join(Student, Course.students) \
-                             .filter(Student.id==g.current_user.id)
+                             .filter(Student.id==g.current_user.id, Course.deleted_at.is_(None))
     paginate = PaginatedQuery(
         base_query.order_by(Course.name),
         base_query.count(),
@@ -46,16 +51,65 @@ def get_applied_courses():
     result = paginate.execute()
     return jsonify(result)
 
+@student_api.route('/dashboard', methods=['GET'])
+@token_auth.login_required
+@check_user(Student)
+def get_dashboard():
+    student_id = g.current_user.id
+    courses = db.session.query(Course.id, Course.name, Course.description, Course.student_count, Teacher.name) \
+                        .join(students_courses_table, students_courses_table.c.course_id==Course.id) \
+                        .outerjoin(Teacher, Teacher.id==Course.teacher_id) \
+                        .filter(students_courses_table.c.student_id==student_id, Course.deleted_at.is_(None)) \
+                        .order_by(Course.name) \
+                        .all()
+    latest_solution = db.session.query(Solution.id) \
+                                .filter(Solution.homework_id==Homework.id, Solution.student_id==student_id) \
+                                .order_by(Solution.submitted_at.desc(), Solution.id.desc()) \
+                                .limit(1) \
+                                .correlate(Homework) \
+                                .as_scalar()
+    homeworks = db.session.query(Homework.id, Homework.name, Homework.description, Homework.deadline,
+                                 Course.id, Course.name, Solution.id, Solution.submitted_at, Solution.status) \
+                          .join(students_homeworks_table, students_homeworks_table.c.homework_id==Homework.id) \
+                          .join(Course, Course.id==Homework.course_id) \
+                          .outerjoin(Solution, Solution.id==latest_solution) \
+                          .filter(students_homeworks_table.c.student_id==student_id,
+                                  Homework.deleted_at.is_(None),
+                                  Course.deleted_at.is_(None)) \
+                          .order_by(Homework.deadline, Homework.name) \
+                          .all()
+    return jsonify({
+        'courses': [{
+            'id': id,
+            'name': name,
+            'description': description,
+            'teacher': teacher,
+            'student_count': student_count
+        } for id, name, description, student_count, teacher in courses],
+        'homeworks': [{
+            'id': id,
+            'name': name,
+            'description': description,
+            'deadline': deadline.strftime('%Y-%m-%d %H:%M:%S'),
+            'course_id': course_id,
+            'course': course,
+            'latest_solution': None if solution_id is None else {
+                'id': solution_id,
+                'submitted_at': submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'status': status
+            }
+        } for id, name, description, deadline, course_id, course, solution_id, submitted_at, status in homeworks]
+    })
+
 @student_api.route('/course/<int:id>', methods=['POST'])
 @token_auth.login_required
 @check_user(Student)
 def apply_for_course(id):
-    course = Course.query.filter_by(id=id).first()
+    course = Course.query.filter_by(id=id, deleted_at=None).first()
     if course is None:
         return '', 410
-    if g.current_user in course.students:
+    if not course.add_student(g.current_user.id):
         return '', 304
-    course.students.append(g.current_user)
     db.session.commit()
     return '', 200
 
@@ -63,30 +117,31 @@ def apply_for_course(id):
 @token_auth.login_required
 @check_user(Student)
 def abandon_course(id):
-    course = Course.query.filter_by(id=id).first()
+    course = Course.query.filter_by(id=id, deleted_at=None).first()
     if course is None:
         return '', 410
-    if g.current_user not in course.students:
+    if not course.remove_student(g.current_user.id):
         return '', 304
-    course.students.remove(g.current_user)
     db.session.commit()
     return '', 200
 
 @student_api.route('/course/<int:id>/homeworks', methods=['GET'])
 @token_auth.login_required
 @check_user(Student)
+@coalesce
 def get_homeworks_for_course(id):
     start = request.args.get('start', 1, type=int)
     limit = request.args.get('limit', 25, type=int)
     base_query = Homework.query.join(Course, Course.id==Homework.course_id) \
-                               .filter(Course.id==id)
+                               .filter(Course.id==id, Homework.deleted_at.is_(None))
     paginate = PaginatedQuery(
         base_query.order_by(Homework.name),
         base_query.count(),
         'student_api.get_homeworks_for_course',
         'homeworks',
         start,
-        limit
+        limit,
+        {'id': id}
     )
     result = paginate.execute()
     return jsonify(result)
@@ -95,14 +150,18 @@ def get_homeworks_for_course(id):
 @token_auth.login_required
 @check_user(Student)
 def apply_for_homework(id):
-    homework = Homework.query.filter_by(id=id).first()
+    homework = Homework.query.filter_by(id=id, deleted_at=None).first()
     if homework is None:
         return '', 410
     if not homework.self_assignable:
         return '', 409
-    if g.current_user in homework.students:
+    try:
+        added = homework.add_student(g.current_user.id)
+    except HeadcountExceeded:
+        db.session.rollback()
+        return '', 409
+    if not added:
         return '', 304
-    homework.students.append(g.current_user)
     db.session.commit()
     return '', 200
 
@@ -110,12 +169,11 @@ def apply_for_homework(id):
 @token_auth.login_required
 @check_user(Student)
 def abandon_homework(id):
-    homework = Homework.query.filter_by(id=id).first()
+    homework = Homework.query.filter_by(id=id, deleted_at=None).first()
     if homework is None:
         return '', 410
-    if g.current_user not in homework.students:
+    if not homework.remove_student(g.current_user.id):
         return '', 304
-    homework.students.remove(g.current_user)
     db.session.commit()
     return '', 200
 
@@ -125,19 +183,17 @@ def abandon_homework(id):
 def submit_solution(id):
     if 'file' not in request.files:
         return '', 400
-    homework = Homework.query.filter_by(id=id).first()
+    homework = Homework.query.filter_by(id=id, deleted_at=None).first()
     if homework is None:
         return '', 410
-    student = Student.query.filter_by(id=g.current_user.id).first()
-    if student not in homework.students:
+    if not homework.has_student(g.current_user.id):
         return '', 409
-    course = Course.query.join(Homework, Homework.course_id==Course.id) \
-                         .filter(Homework.id==id) \
-                         .first()
+    course = Course.query.filter_by(id=homework.course_id, deleted_at=None).first()
     if course is None:
         return '', 410
     solution = Solution()
     solution.homework_id = homework.id
+    solution.student_id = g.current_user.id
     course_folder = course.name
     homework_folder = homework.name
     filename = secure_filename(request.files['file'].filename)
@@ -157,7 +213,7 @@ def get_homeworks():
     start = request.args.get('start', 1, type=int)
     limit = request.args.get('limit', 25, type=int)
     base_query = Homework.query.join(Student, Homework.students) \
-                               .filter(Student.id==g.current_user.id)
+                               .filter(Student.id==g.current_user.id, Homework.deleted_at.is_(None))
     paginate = PaginatedQuery(
         base_query.order_by(Homework.name),
         base_query.count(),
@@ -169,6 +225,28 @@ def get_homeworks():
     result = paginate.execute()
     return jsonify(result)
 
+@student_api.route('/homeworks/upcoming', methods=['GET'])
+@token_auth.login_required
+@check_user(Student)
+def get_upcoming_homeworks():
+    base_query = db.session.query(Homework, Course.name) \
+                           .join(students_homeworks_table, students_homeworks_table.c.homework_id==Homework.id) \
+                           .join(Course, Course.id==Homework.course_id) \
+                           .filter(students_homeworks_table.c.student_id==g.current_user.id,
+                                   Homework.deleted_at.is_(None),
+                                   Course.deleted_at.is_(None))
+    result = paginate_window(
+        base_query,
+        [Homework.deadline, Homework.id],
+        lambda row: (row.Homework.deadline, row.Homework.id),
+        'student_api.get_upcoming_homeworks',
+        'homeworks',
+        lambda row: row.Homework.to_dict(row.name)
+    )
+    if result is None:
+        return '', 400
+    return jsonify(result)
+
 @student_api.route('/homework/<int:id>/solutions', methods=['GET'])
 @token_auth.login_required
 @check_user(Student)
@@ -177,14 +255,15 @@ def get_solutions(id):
     limit = request.args.get('limit', 25, type=int)
     base_query = Solution.query.join(Homework, Homework.id==Solution.homework_id) \
                               .join(Student, Homework.students) \
-                              .filter(Student.id==g.current_user.id, Homework.id==id)
+                              .filter(Student.id==g.current_user.id, Homework.id==id, Homework.deleted_at.is_(None))
     paginate = PaginatedQuery(
         base_query.order_by(Homework.name),
         base_query.count(),
         'student_api.get_solutions',
         'solutions',
         start,
-        limit
+        limit,
+        {'id': id}
     )
     result = paginate.execute()
     return jsonify(result)
@@ -193,7 +272,9 @@ def get_solutions(id):
 @token_auth.login_required
 @check_user(Student)
 def get_solution(id):
-    solution = Solution.query.filter_by(id=id).first()
+    solution = Solution.query.join(Homework, Homework.id==Solution.homework_id) \
+                             .filter(Solution.id==id, Homework.deleted_at.is_(None)) \
+                             .first()
     if solution is None:
         return '', 410
     return jsonify({
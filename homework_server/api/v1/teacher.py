@@ -2,20 +2,25 @@ from flask import Blueprint, current_app, g, jsonify, request, url_for
 
 from .auth import check_user, token_auth
 from homework_server import db
+from homework_server.cache import cached
+from homework_server.cleanup import purge_course, purge_homework
+from homework_server.jobs import enqueue
 from homework_server.models import Course, Homework, Solution, Student, Teacher
-from homework_server.pagination import PaginatedQuery
+from homework_server.pagination import PaginatedQuery, paginate_window
 
 teacher_api = Blueprint('teacher_api', __name__)
 
 @teacher_api.route('/courses', methods=['GET'])
 @token_auth.login_required
 @check_user(Teacher)
+@cached(Course, Teacher)
 def get_courses():
     start = request.args.get('start', 1, type=int)
     limit = request.args.get('limit', 25, type=int)
+    base_query = Course.query.filter(Course.deleted_at.is_(None))
     paginate = PaginatedQuery(
-        Course.query.order_by(Course.name),
-        Course.query.count(),
+        base_query.order_by(Course.name),
+        base_query.count(),
         'teacher_api.get_courses',
         'courses',
         start,
@@ -42,11 +47,12 @@ def create_course():
 @token_auth.login_required
 @check_user(Teacher)
 def remove_course(id):
-    course = Course.query.filter_by(id=id).first()
+    course = Course.query.filter_by(id=id, deleted_at=None).first()
     if course is None:
         return '', 410
-    db.session.delete(course)
+    course.mark_deleted()
     db.session.commit()
+    enqueue(purge_course, id)
     return '', 200
 
 @teacher_api.route('/course/<int:id>/homeworks', methods=['GET'])
@@ -56,14 +62,15 @@ def get_homeworks(id):
     start = request.args.get('start', 1, type=int)
     limit = request.args.get('limit', 25, type=int)
     base_query = Homework.query.join(Course, Course.id==Homework.course_id) \
-                               .filter(Course.id==id)
+                               .filter(Course.id==id, Homework.deleted_at.is_(None))
     paginate = PaginatedQuery(
         base_query.order_by(Homework.name),
         base_query.count(),
         'teacher_api.get_homeworks',
         'homeworks',
         start,
-        limit
+        limit,
+        {'id': id}
     )
     result = paginate.execute()
     return jsonify(result)
@@ -79,9 +86,37 @@ def create_homework(id):
     homework.from_dict(data)
     homework.course_id = id
     db.session.add(homework)
+    if 'students' in data:
+        result, errors = homework.assign_students(data['students'])
+        if errors:
+            db.session.rollback()
+            return jsonify({'errors': errors}), 400
+        db.session.commit()
+        return jsonify({'students': result})
     db.session.commit()
     return '', 200
 
+@teacher_api.route('/homeworks/upcoming', methods=['GET'])
+@token_auth.login_required
+@check_user(Teacher)
+def get_upcoming_homeworks():
+    base_query = db.session.query(Homework, Course.name) \
+                           .join(Course, Course.id==Homework.course_id) \
+                           .filter(Course.teacher_id==g.current_user.id,
+                                   Homework.deleted_at.is_(None),
+                                   Course.deleted_at.is_(None))
+    result = paginate_window(
+        base_query,
+        [Homework.deadline, Homework.id],
+        lambda row: (row.Homework.deadline, row.Homework.id),
+        'teacher_api.get_upcoming_homeworks',
+        'homeworks',
+        lambda row: row.Homework.to_dict(row.name)
+    )
+    if result is None:
+        return '', 400
+    return jsonify(result)
+
 @teacher_api.route('/homework/<int:id>', methods=['PUT'])
 @token_auth.login_required
 @check_user(Teacher)
@@ -89,10 +124,17 @@ def modify_homework(id):
     data = request.get_json() or {}
     if not any(field in data for field in ['name', 'description', 'deadline', 'headcount', 'self_assignable', 'students']):
         return '', 400
-    homework = Homework.query.filter_by(id=id).first()
+    homework = Homework.query.filter_by(id=id, deleted_at=None).first()
     if homework is None:
         return '', 410
     homework.from_dict(data)
+    if 'students' in data:
+        result, errors = homework.assign_students(data['students'])
+        if errors:
+            db.session.rollback()
+            return jsonify({'errors': errors}), 400
+        db.session.commit()
+        return jsonify({'students': result})
     db.session.commit()
     return '', 200
 
@@ -100,11 +142,12 @@ def modify_homework(id):
 @token_auth.login_required
 @check_user(Teacher)
 def remove_homework(id):
-    homework = Homework.query.filter_by(id=id).first()
+    homework = Homework.query.filter_by(id=id, deleted_at=None).first()
     if homework is None:
         return '', 410
-    db.session.delete(homework)
+    homework.mark_deleted()
     db.session.commit()
+    enqueue(purge_homework, id)
     return '', 200
 
 @teacher_api.route('/course/<int:id>/students', methods=['GET'])
@@ -113,18 +156,84 @@ def remove_homework(id):
 def get_students(id):
     start = request.args.get('start', 1, type=int)
     limit = request.args.get('limit', 25, type=int)
-    base_query = Student.query.join(Course, Student.courses)
+    base_query = Student.query.join(Course, Student.courses) \
+                              .filter(Course.id==id)
     paginate = PaginatedQuery(
         base_query.order_by(Student.name),
         base_query.count(),
         'teacher_api.get_students',
         'students',
         start,
-        limit
+        limit,
+        {'id': id}
     )
     result = paginate.execute()
     return jsonify(result)
 
+@teacher_api.route('/course/<int:id>/summary', methods=['GET'])
+@token_auth.login_required
+@check_user(Teacher)
+@cached(Course, Homework, Solution)
+def get_summary(id):
+    course = Course.query.filter_by(id=id, deleted_at=None).first()
+    if course is None:
+        return '', 410
+    homeworks = db.session.query(Homework.id, Homework.name, Homework.deadline, Homework.assigned_count,
+                                 db.func.count(db.distinct(Solution.student_id)),
+                                 db.func.count(Solution.id),
+                                 db.func.max(Solution.submitted_at)) \
+                          .outerjoin(Solution, Solution.homework_id==Homework.id) \
+                          .filter(Homework.course_id==id, Homework.deleted_at.is_(None)) \
+                          .group_by(Homework.id) \
+                          .order_by(Homework.deadline, Homework.name) \
+                          .all()
+    statuses = db.session.query(Solution.homework_id, Solution.status, db.func.count()) \
+                         .join(Homework, Homework.id==Solution.homework_id) \
+                         .filter(Homework.course_id==id, Homework.deleted_at.is_(None)) \
+                         .group_by(Solution.homework_id, Solution.status) \
+                         .all()
+    by_status = {}
+    for homework_id, status, count in statuses:
+        counts = by_status.setdefault(homework_id, {})
+        counts[status or ''] = counts.get(status or '', 0) + count
+    return jsonify({
+        'course': course.name,
+        'homeworks': [{
+            'id': homework_id,
+            'name': name,
+            'deadline': deadline.strftime('%Y-%m-%d %H:%M:%S'),
+            'assigned': assigned,
+            'submitted': submitted,
+            'solutions': solutions,
+            'by_status': by_status.get(homework_id, {}),
+            'latest_submission': latest.strftime('%Y-%m-%d %H:%M:%S') if latest is not None else None
+        } for homework_id, name, deadline, assigned, submitted, solutions, latest in homeworks]
+    })
+
+@teacher_api.route('/course/<int:id>/students', methods=['POST'])
+@token_auth.login_required
+@check_user(Teacher)
+def enroll_students(id):
+    data = request.get_json()
+    if isinstance(data, dict):
+        data = data.get('students')
+    if not isinstance(data, list):
+        return '', 400
+    course = Course.query.filter_by(id=id, deleted_at=None).first()
+    if course is None:
+        return '', 410
+    resolved = Student.resolve(data)
+    student_ids = set(resolved.values())
+    added = course.add_students(student_ids)
+    db.session.commit()
+    unknown = [ref for ref in data if type(ref) not in (int, str) or ref not in resolved]
+    return jsonify({
+        'added': added,
+        'existing': len(student_ids) - added,
+        'unknown': len(unknown),
+        'unknown_students': unknown
+    })
+
 @teacher_api.route('/homework/<int:id>/solutions', methods=['GET'])
 @token_auth.login_required
 @check_user(Teacher)
@@ -132,14 +241,15 @@ def get_solutions(id):
     start = request.args.get('start', 1, type=int)
     limit = request.args.get('limit', 25, type=int)
     base_query = Solution.query.join(Homework, Homework.id==Solution.homework_id) \
-                               .filter(Homework.id==id)
+                               .filter(Homework.id==id, Homework.deleted_at.is_(None))
     paginate = PaginatedQuery(
         base_query.order_by(Solution.submitted_at.desc()),
         base_query.count(),
         'teacher_api.get_solutions',
         'solutions',
         start,
-        limit
+        limit,
+        {'id': id}
     )
     result = paginate.execute()
     return jsonify(result)
@@ -148,7 +258,9 @@ def get_solutions(id):
 @token_auth.login_required
 @check_user(Teacher)
 def get_solution(id):
-    solution = Solution.query.filter_by(id=id).first()
+    solution = Solution.query.join(Homework, Homework.id==Solution.homework_id) \
+                             .filter(Solution.id==id, Homework.deleted_at.is_(None)) \
+                             .first()
     if solution is None:
         return '', 410
     return jsonify({
@@ -162,7 +274,9 @@ def modify_solution(id):
     data = request.get_json() or {}
     if 'status' not in data:
         return '', 400
-    solution = Solution.query.filter_by(id=id).first()
+    solution = Solution.query.join(Homework, Homework.id==Solution.homework_id) \
+                             .filter(Solution.id==id, Homework.deleted_at.is_(None)) \
+                             .first()
     if solution is None:
         return '', 410
     solution.from_dict(data)
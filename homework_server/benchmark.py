@@ -0,0 +1,304 @@
+import base64
+import json
+import math
+import os
+from io import BytesIO
+from time import perf_counter
+
+from sqlalchemy import event
+
+from . import db
+from .dataset import DATASET_PASSWORD
+from .models import Course, Homework, Solution, Student, Teacher, User, students_courses_table, students_homeworks_table
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+class BenchmarkContext:
+    def __init__(self, app):
+        self.app = app
+        self.tokens = {}
+        self.abandoned = {}
+        self.teacher = Teacher.query.order_by(Teacher.id).first()
+        self.courses = [id for id, in db.session.query(Course.id).order_by(Course.id)]
+        self.homeworks = [id for id, in db.session.query(Homework.id).order_by(Homework.id)]
+        self.self_assignable = [id for id, in db.session.query(Homework.id)
+                                                    .filter(Homework.self_assignable==True)
+                                                    .order_by(Homework.id)]
+        self.solutions = [id for id, in db.session.query(Solution.id)
+                                               .filter(Solution.homework_id <= self.homeworks[len(self.homeworks) // 2])
+                                               .order_by(Solution.id)
+                                               .limit(1000)]
+        self.students = [id for id, in db.session.query(Student.id).order_by(Student.id)]
+
+    def token(self, username):
+        if username not in self.tokens:
+            user = User.query.filter_by(username=username).first()
+            self.tokens[username] = user.get_token()
+            db.session.commit()
+        return self.tokens[username]
+
+    def headers(self, username, json_body=True):
+        headers = {'Authorization': f'Bearer {self.token(username)}'}
+        if json_body:
+            headers['Content-type'] = 'application/json'
+        return headers
+
+    def student(self, i):
+        student_id = self.students[i % len(self.students)]
+        return student_id, User.query.get(student_id).username
+
+    def first_row(self, table, key, student_id, last=False):
+        column = table.c[key]
+        order = column.desc() if last else column
+        return db.session.query(column).filter(table.c.student_id==student_id).order_by(order).limit(1).scalar()
+
+def admin_routes():
+    def bulk(prefix):
+        def route(ctx, i):
+            rows = [{'name': f'{prefix} {i} {k}', 'username': f'{prefix}-{i}-{k}', 'password': 'password'} for k in range(10)]
+            return 'POST', f'/api/v1/admin/{prefix}s/bulk', {'headers': ctx.headers('admin'), 'data': json.dumps(rows)}
+        return route
+
+    def create(prefix):
+        def route(ctx, i):
+            data = {'name': f'{prefix} {i}', 'username': f'{prefix}-{i}', 'password': 'password'}
+            return 'POST', f'/api/v1/admin/{prefix}s', {'headers': ctx.headers('admin'), 'data': json.dumps(data)}
+        return route
+
+    def remove(prefix):
+        def route(ctx, i):
+            user = User.query.filter_by(username=f'{prefix}-{i}').first()
+            return 'DELETE', f'/api/v1/admin/{prefix}/{user.id}', {'headers': ctx.headers('admin')}
+        return route
+
+    return [
+        ('admin_api.get_teachers', lambda ctx, i: ('GET', f'/api/v1/admin/teachers?start={i % 4 + 1}', {'headers': ctx.headers('admin')})),
+        ('admin_api.create_teacher', create('teacher')),
+        ('admin_api.create_teachers_bulk', bulk('teacher')),
+        ('admin_api.remove_teacher', remove('teacher')),
+        ('admin_api.get_students', lambda ctx, i: ('GET', f'/api/v1/admin/students?start={i % 4 + 1}', {'headers': ctx.headers('admin')})),
+        ('admin_api.create_studetns', create('student')),
+        ('admin_api.create_students_bulk', bulk('student')),
+        ('admin_api.remove_student', remove('student')),
+        ('admin_api.get_pool_statistics', lambda ctx, i: ('GET', '/api/v1/admin/database/pool', {'headers': ctx.headers('admin')})),
+        ('admin_api.get_metrics_text', lambda ctx, i: ('GET', '/api/v1/admin/metrics', {'headers': ctx.headers('admin')}))
+    ]
+
+def auth_routes():
+    def get_token(ctx, i):
+        credentials = base64.b64encode(f'admin:{DATASET_PASSWORD}'.encode()).decode('utf-8')
+        return 'POST', '/api/v1/auth/token', {'headers': {'Authorization': f'Basic {credentials}'}}
+
+    def revoke_token(ctx, i):
+        _, username = ctx.student(i)
+        headers = ctx.headers(username)
+        del ctx.tokens[username]
+        return 'DELETE', '/api/v1/auth/token', {'headers': headers}
+
+    return [
+        ('auth_api.get_token', get_token),
+        ('auth_api.check_token', lambda ctx, i: ('GET', '/api/v1/auth/token', {'headers': ctx.headers('admin')})),
+        ('auth_api.revoke_token', revoke_token)
+    ]
+
+def teacher_routes():
+    def teacher(ctx):
+        return ctx.headers(ctx.teacher.username)
+
+    def create_homework(ctx, i):
+        data = {
+            'name': f'benchmark homework {i}',
+            'description': 'homework',
+            'deadline': '2018-11-08 08:48:11',
+            'headcount': 10,
+            'self_assignable': False,
+            'students': ctx.students[i:i + 5]
+        }
+        return 'POST', f'/api/v1/teacher/course/{ctx.courses[i % len(ctx.courses)]}/homeworks', \
+               {'headers': teacher(ctx), 'data': json.dumps(data)}
+
+    def modify_homework(ctx, i):
+        data = {'description': f'revision {i}', 'students': {'add': ctx.students[i:i + 2]}}
+        return 'PUT', f'/api/v1/teacher/homework/{ctx.homeworks[i % len(ctx.homeworks)]}', \
+               {'headers': teacher(ctx), 'data': json.dumps(data)}
+
+    def enroll_students(ctx, i):
+        data = {'students': ctx.students[i * 10:(i + 1) * 10]}
+        return 'POST', f'/api/v1/teacher/course/{ctx.courses[i % len(ctx.courses)]}/students', \
+               {'headers': teacher(ctx), 'data': json.dumps(data)}
+
+    return [
+        ('teacher_api.get_courses', lambda ctx, i: ('GET', f'/api/v1/teacher/courses?start={i % 4 + 1}', {'headers': teacher(ctx)})),
+        ('teacher_api.create_course', lambda ctx, i: ('POST', '/api/v1/teacher/courses',
+                                                      {'headers': teacher(ctx),
+                                                       'data': json.dumps({'name': f'benchmark course {i}', 'description': 'course'})})),
+        ('teacher_api.get_homeworks', lambda ctx, i: ('GET', f'/api/v1/teacher/course/{ctx.courses[i % len(ctx.courses)]}/homeworks',
+                                                      {'headers': teacher(ctx)})),
+        ('teacher_api.create_homework', create_homework),
+        ('teacher_api.modify_homework', modify_homework),
+        ('teacher_api.get_students', lambda ctx, i: ('GET', f'/api/v1/teacher/course/{ctx.courses[i % len(ctx.courses)]}/students',
+                                                     {'headers': teacher(ctx)})),
+        ('teacher_api.enroll_students', enroll_students),
+        ('teacher_api.get_solutions', lambda ctx, i: ('GET', f'/api/v1/teacher/homework/{ctx.homeworks[i % len(ctx.homeworks)]}/solutions',
+                                                      {'headers': teacher(ctx)})),
+        ('teacher_api.get_solution', lambda ctx, i: ('GET', f'/api/v1/teacher/solution/{ctx.solutions[i % len(ctx.solutions)]}',
+                                                     {'headers': teacher(ctx)})),
+        ('teacher_api.modify_solution', lambda ctx, i: ('PUT', f'/api/v1/teacher/solution/{ctx.solutions[i % len(ctx.solutions)]}',
+                                                        {'headers': teacher(ctx), 'data': json.dumps({'status': f'reviewed {i}'})})),
+        ('teacher_api.get_summary', lambda ctx, i: ('GET', f'/api/v1/teacher/course/{ctx.courses[i % len(ctx.courses)]}/summary',
+                                                    {'headers': teacher(ctx)})),
+        ('teacher_api.get_upcoming_homeworks', lambda ctx, i: ('GET', '/api/v1/teacher/homeworks/upcoming?within=30',
+                                                               {'headers': teacher(ctx)}))
+    ]
+
+def removal_routes():
+    def teacher(ctx):
+        return ctx.headers(ctx.teacher.username)
+
+    return [
+        ('teacher_api.remove_homework', lambda ctx, i: ('DELETE', f'/api/v1/teacher/homework/{ctx.homeworks[-(i + 1)]}',
+                                                        {'headers': teacher(ctx)})),
+        ('teacher_api.remove_course', lambda ctx, i: ('DELETE', f'/api/v1/teacher/course/{ctx.courses[-(i + 1)]}',
+                                                      {'headers': teacher(ctx)}))
+    ]
+
+def student_routes():
+    def student(ctx, i, json_body=True):
+        _, username = ctx.student(i)
+        return ctx.headers(username, json_body)
+
+    def abandon_course(ctx, i):
+        student_id, _ = ctx.student(i)
+        course_id = ctx.first_row(students_courses_table, 'course_id', student_id)
+        ctx.abandoned[i] = course_id
+        return 'DELETE', f'/api/v1/student/course/{course_id}', {'headers': student(ctx, i)}
+
+    def apply_for_course(ctx, i):
+        course_id = ctx.abandoned.get(i, ctx.courses[i % len(ctx.courses)])
+        return 'POST', f'/api/v1/student/course/{course_id}', {'headers': student(ctx, i)}
+
+    def abandon_homework(ctx, i):
+        student_id, _ = ctx.student(i)
+        homework_id = ctx.first_row(students_homeworks_table, 'homework_id', student_id)
+        return 'DELETE', f'/api/v1/student/homework/{homework_id}', {'headers': student(ctx, i)}
+
+    def apply_for_homework(ctx, i):
+        homework_id = ctx.self_assignable[i % len(ctx.self_assignable)]
+        return 'POST', f'/api/v1/student/homework/{homework_id}', {'headers': student(ctx, i)}
+
+    def submit_solution(ctx, i):
+        student_id, _ = ctx.student(i)
+        homework_id = ctx.first_row(students_homeworks_table, 'homework_id', student_id, last=True)
+        return 'POST', f'/api/v1/student/homework/{homework_id}/submit', {
+            'headers': student(ctx, i, json_body=False),
+            'data': {'file': (BytesIO(b'solution'), f'solution{i}.txt')},
+            'content_type': 'multipart/form-data'
+        }
+
+    def get_solutions(ctx, i):
+        student_id, _ = ctx.student(i)
+        homework_id = ctx.first_row(students_homeworks_table, 'homework_id', student_id, last=True)
+        return 'GET', f'/api/v1/student/homework/{homework_id}/solutions', {'headers': student(ctx, i)}
+
+    return [
+        ('student_api.get_courses', lambda ctx, i: ('GET', f'/api/v1/student/courses/all?start={i % 4 + 1}', {'headers': student(ctx, i)})),
+        ('student_api.get_applied_courses', lambda ctx, i: ('GET', '/api/v1/student/courses', {'headers': student(ctx, i)})),
+        ('student_api.get_dashboard', lambda ctx, i: ('GET', '/api/v1/student/dashboard', {'headers': student(ctx, i)})),
+        ('student_api.abandon_course', abandon_course),
+        ('student_api.apply_for_course', apply_for_course),
+        ('student_api.get_homeworks_for_course', lambda ctx, i: ('GET', f'/api/v1/student/course/{ctx.courses[i % len(ctx.courses)]}/homeworks',
+                                                                 {'headers': student(ctx, i)})),
+        ('student_api.abandon_homework', abandon_homework),
+        ('student_api.apply_for_homework', apply_for_homework),
+        ('student_api.submit_solution', submit_solution),
+        ('student_api.get_homeworks', lambda ctx, i: ('GET', '/api/v1/student/homeworks', {'headers': student(ctx, i)})),
+        ('student_api.get_upcoming_homeworks', lambda ctx, i: ('GET', '/api/v1/student/homeworks/upcoming?within=30',
+                                                               {'headers': student(ctx, i)})),
+        ('student_api.get_solutions', get_solutions),
+        ('student_api.get_solution', lambda ctx, i: ('GET', f'/api/v1/student/solution/{ctx.solutions[i % len(ctx.solutions)]}',
+                                                     {'headers': student(ctx, i)}))
+    ]
+
+def search_routes():
+    return [
+        ('search_api.search', lambda ctx, i: ('GET', f'/api/v1/search?q={("course", "homework")[i % 2]}', {'headers': ctx.headers('admin')}))
+    ]
+
+ROUTES = auth_routes() + admin_routes() + teacher_routes() + student_routes() + search_routes() + removal_routes()
+
+def run_route(app, ctx, route, iterations):
+    statements = []
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    latencies = []
+    queries = []
+    errors = 0
+    engine = db.get_engine()
+    for i in range(iterations):
+        method, url, kwargs = route(ctx, i)
+        del statements[:]
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        start = perf_counter()
+        rv = client.open(url, method=method, **kwargs)
+        latencies.append(perf_counter() - start)
+        event.remove(engine, 'before_cursor_execute', count_statement)
+        queries.append(len(statements))
+        if rv.status_code >= 400:
+            errors += 1
+    total = sum(latencies)
+    return {
+        'requests': iterations,
+        'errors': errors,
+        'throughput': round(iterations / total, 2) if total else None,
+        'p50': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99': round(percentile(latencies, 0.99) * 1000, 3),
+        'queries': round(sum(queries) / iterations, 2)
+    }
+
+def run_benchmark(app, iterations, routes=None):
+    ctx = BenchmarkContext(app)
+    results = {}
+    for endpoint, route in ROUTES:
+        if routes and endpoint not in routes:
+            continue
+        results[endpoint] = run_route(app, ctx, route, iterations)
+    return results
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for endpoint, result in sorted(results.items()):
+        expected = baseline.get(endpoint)
+        if expected is None:
+            continue
+        if result['queries'] > expected['queries']:
+            regressions.append((endpoint, 'queries', expected['queries'], result['queries']))
+        if result['p95'] > expected['p95'] * (1 + tolerance):
+            regressions.append((endpoint, 'p95', expected['p95'], result['p95']))
+    return regressions
+
+def format_results(results, baseline=None):
+    lines = [f'{"endpoint":42} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>8} {"errors":>6}']
+    for endpoint, result in sorted(results.items()):
+        line = f'{endpoint:42} {result["throughput"]:9.1f} {result["p50"]:9.2f} {result["p95"]:9.2f} ' \
+               f'{result["p99"]:9.2f} {result["queries"]:8.1f} {result["errors"]:6d}'
+        expected = (baseline or {}).get(endpoint)
+        if expected and expected['p95']:
+            line += f'  p95 {(result["p95"] / expected["p95"] - 1) * 100:+.0f}%'
+        lines.append(line)
+    return '\n'.join(lines)
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
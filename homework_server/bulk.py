@@ -0,0 +1,112 @@
+import csv
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+from . import db
+from .models import User
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def parse_import(request, key):
+    if request.mimetype == 'text/csv':
+        reader = csv.DictReader(io.StringIO(request.get_data(as_text=True)))
+        return list(reader)
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list):
+        return None
+    return data
+
+password_pools = {}
+password_pools_lock = Lock()
+
+def get_password_pool(workers):
+    key = (os.getpid(), workers)
+    with password_pools_lock:
+        pool = password_pools.get(key)
+        if pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            pool = password_pools[key] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method))
+    return pool
+
+def hash_passwords(passwords, workers=1):
+    if workers <= 1 or len(passwords) <= 1:
+        return [generate_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(get_password_pool(workers).map(generate_password_hash, passwords, chunksize=chunksize))
+
+def validate_row(row):
+    if not isinstance(row, dict):
+        return 'expected an object'
+    for field, max_length in [('name', 64), ('username', 32), ('password', None)]:
+        value = row.get(field)
+        if not isinstance(value, str) or not value:
+            return f'missing {field}'
+        if max_length is not None and len(value) > max_length:
+            return f'{field} is too long'
+    return None
+
+def import_users(user_type, rows):
+    assert issubclass(user_type, User)
+    results = [{'row': i + 1} for i in range(len(rows))]
+
+    valid = []
+    seen = set()
+    for result, row in zip(results, rows):
+        error = validate_row(row)
+        if error is None and row['username'] in seen:
+            error = 'duplicate username in request'
+        if error is not None:
+            result.update({'status': 'error', 'error': error})
+            continue
+        result['username'] = row['username']
+        seen.add(row['username'])
+        valid.append((result, row))
+
+    users = User.__table__
+    if seen:
+        existing = {row[0] for row in db.session.query(users.c.username).filter(users.c.username.in_(seen))}
+        for result, row in valid:
+            if row['username'] in existing:
+                result.update({'status': 'error', 'error': 'username already exists'})
+        valid = [(result, row) for result, row in valid if row['username'] not in existing]
+
+    config = current_app.config
+    password_hashes = hash_passwords([row['password'] for _, row in valid],
+                                     config['BULK_IMPORT_WORKERS'] // config['SERVER_WORKERS'])
+
+    identity = user_type.__mapper__.polymorphic_identity
+    mappings = [{
+        'type': identity,
+        'name': row['name'],
+        'username': row['username'],
+        'password_hash': password_hash
+    } for (_, row), password_hash in zip(valid, password_hashes)]
+
+    for chunk in chunks(mappings, current_app.config['BULK_IMPORT_CHUNK_SIZE']):
+        db.session.execute(users.insert(), chunk)
+        usernames = [mapping['username'] for mapping in chunk]
+        ids = dict(db.session.query(users.c.username, users.c.id).filter(users.c.username.in_(usernames)))
+        db.session.execute(user_type.__table__.insert(), [{'id': ids[username]} for username in usernames])
+        for mapping in chunk:
+            mapping['id'] = ids[mapping['username']]
+
+    for (result, _), mapping in zip(valid, mappings):
+        result.update({'status': 'created', 'id': mapping['id']})
+
+    db.session.commit()
+
+    return {
+        'created': len(valid),
+        'failed': len(rows) - len(valid),
+        'results': results
+    }
@@ -0,0 +1,241 @@
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock, local
+from time import time
+
+from flask import current_app, g, has_app_context, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+from sqlalchemy.sql.dml import UpdateBase
+from werkzeug.contrib.cache import BaseCache, FileSystemCache, NullCache, RedisCache
+
+from . import db
+from .replicas import RoutingSession
+
+pending = local()
+
+class LRUCache(BaseCache):
+    def __init__(self, max_entries=1024, default_timeout=300):
+        super(LRUCache, self).__init__(default_timeout)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires and expires <= time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        with self._lock:
+            self._entries[key] = (time() + timeout if timeout else 0, value)
+            self._entries.move_to_end(key)
+            self._evict()
+        return True
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if key in self._entries:
+                return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        return True
+
+    def inc(self, key, delta=1):
+        with self._lock:
+            expires, value = self._entries.get(key, (0, 0))
+            self._entries[key] = (expires, (value or 0) + delta)
+            self._entries.move_to_end(key)
+            self._evict()
+            return value + delta
+
+def create_backend(config):
+    backend = config['RESPONSE_CACHE']
+    timeout = config['RESPONSE_CACHE_TIMEOUT']
+    if backend == 'local':
+        return LRUCache(config['RESPONSE_CACHE_MAX_ENTRIES'], timeout)
+    if backend == 'filesystem':
+        return FileSystemCache(config['RESPONSE_CACHE_DIR'], config['RESPONSE_CACHE_MAX_ENTRIES'], timeout)
+    if backend == 'redis':
+        return RedisCache(config['RESPONSE_CACHE_REDIS_HOST'], config['RESPONSE_CACHE_REDIS_PORT'],
+                          default_timeout=timeout, key_prefix='homework_server:')
+    if backend == 'none':
+        return NullCache()
+    raise ValueError(f'unknown response cache backend {backend}')
+
+def request_fingerprint():
+    role = g.current_user.type if g.get('current_user') is not None else 'anonymous'
+    args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+    return f'{request.endpoint}:{role}:{sorted(request.view_args.items())}:{args}'
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, table):
+        key = f'generation:{table}'
+        value = self.backend.get(key)
+        if value is None:
+            self.backend.add(key, int(time() * 1000), timeout=0)
+            value = self.backend.get(key)
+        return value
+
+    def invalidate(self, tables):
+        for table in tables:
+            self.generation(table)
+            self.backend.inc(f'generation:{table}')
+
+    def key(self, tables):
+        generations = ','.join(str(self.generation(table)) for table in tables)
+        return f'response:{request_fingerprint()}:{generations}'
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+def init_cache(app):
+    registry = app.extensions['metrics']
+
+    @registry.collector
+    def cache_statistics():
+        cache = app.extensions.get('response_cache')
+        if cache is None:
+            return
+        yield 'response_cache_requests_total', 'Cacheable responses by result', 'counter', \
+              [('response_cache_requests_total', (('result', 'hit'),), cache.hits),
+               ('response_cache_requests_total', (('result', 'miss'),), cache.misses)]
+        yield 'response_cache_hit_ratio', 'Share of cacheable responses served from the cache', 'gauge', \
+              [('response_cache_hit_ratio', (), round(cache.hit_ratio(), 6))]
+
+def get_response_cache(app=None):
+    app = app or current_app
+    cache = app.extensions.get('response_cache')
+    if cache is None:
+        config = app.config
+        if config['RESPONSE_CACHE'] == 'local' and config['SERVER_WORKERS'] > 1:
+            app.logger.warning('the local response cache cannot be invalidated across %d worker processes, '
+                               'response caching is disabled; use the filesystem or redis backend',
+                               config['SERVER_WORKERS'])
+            config = dict(config, RESPONSE_CACHE='none')
+        cache = app.extensions['response_cache'] = ResponseCache(create_backend(config))
+    return cache
+
+def cached(*models):
+    tables = [table.name for model in models for table in model.__mapper__.tables]
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            key = cache.key(tables)
+            data = cache.backend.get(key)
+            if data is not None:
+                cache.record(True)
+                response = current_app.response_class(data, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+            cache.record(False)
+            db.session.info.pop('replica', None)
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                cache.backend.set(key, response.get_data())
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+def pending_tables():
+    try:
+        return pending.tables
+    except AttributeError:
+        pending.tables = set()
+        return pending.tables
+
+def has_changes(instance, key):
+    return attributes.get_history(instance, key, passive=attributes.PASSIVE_NO_INITIALIZE).has_changes()
+
+def changed_tables(instance, every=False):
+    mapper = attributes.instance_state(instance).mapper
+    ignored = getattr(instance, 'cache_ignored_columns', ())
+    tables = set()
+    for prop in mapper.column_attrs:
+        if prop.key not in ignored and (every or has_changes(instance, prop.key)):
+            tables.update(column.table.name for column in prop.columns)
+    for prop in mapper.relationships:
+        if prop.secondary is not None and (every or has_changes(instance, prop.key)):
+            tables.add(prop.secondary.name)
+    return tables
+
+@event.listens_for(RoutingSession, 'before_flush')
+def record_flushed_tables(session, flush_context, instances):
+    pending.flushing = True
+    tables = pending_tables()
+    for instance in session.new:
+        tables.update(changed_tables(instance, every=True))
+    for instance in session.dirty:
+        tables.update(changed_tables(instance))
+    for instance in session.deleted:
+        tables.update(changed_tables(instance, every=True))
+
+@event.listens_for(RoutingSession, 'after_flush')
+def end_flush(session, flush_context):
+    pending.flushing = False
+
+@event.listens_for(RoutingSession, 'after_commit')
+def invalidate_committed_tables(session):
+    tables = pending_tables()
+    if tables:
+        get_response_cache(session.app).invalidate(sorted(tables))
+        tables.clear()
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def forget_rolled_back_tables(session):
+    pending.flushing = False
+    pending_tables().clear()
+
+@db.engine_hook
+def watch_statements(app, engine):
+    @event.listens_for(engine, 'after_execute')
+    def record_statement_tables(connection, clauseelement, multiparams, params, result):
+        if not isinstance(clauseelement, UpdateBase) or getattr(pending, 'flushing', False):
+            return
+        tables = pending_tables()
+        tables.add(clauseelement.table.name)
+        if not connection.in_transaction() and has_app_context():
+            get_response_cache().invalidate(sorted(tables))
+            tables.clear()
\ No newline at end of file
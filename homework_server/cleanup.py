@@ -0,0 +1,77 @@
+import os
+
+from flask import current_app
+
+from . import db
+from .models import Course, Homework, Solution, students_courses_table, students_homeworks_table
+
+def remove_files(paths):
+    upload_folder = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+    folders = set()
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        folders.add(os.path.dirname(os.path.abspath(path)))
+    for folder in sorted(folders, reverse=True):
+        while folder.startswith(upload_folder + os.sep):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                break
+            folder = os.path.dirname(folder)
+
+def delete_in_chunks(table, key, value, chunk_size):
+    while True:
+        ids = [row[0] for row in db.session.query(table.c.student_id)
+                                           .filter(table.c[key]==value)
+                                           .limit(chunk_size)]
+        if not ids:
+            return
+        db.session.execute(table.delete().where(db.and_(table.c[key]==value, table.c.student_id.in_(ids))))
+        db.session.commit()
+
+def purge_homework(homework_id):
+    chunk_size = current_app.config['PURGE_CHUNK_SIZE']
+    solutions = Solution.__table__
+    while True:
+        rows = db.session.query(solutions.c.id, solutions.c.file_path) \
+                         .filter(solutions.c.homework_id==homework_id) \
+                         .limit(chunk_size) \
+                         .all()
+        if not rows:
+            break
+        db.session.execute(solutions.delete().where(solutions.c.id.in_([id for id, _ in rows])))
+        db.session.commit()
+        remove_files([file_path for _, file_path in rows])
+
+    delete_in_chunks(students_homeworks_table, 'homework_id', homework_id, chunk_size)
+    homework = Homework.query.options(db.noload('*')).get(homework_id)
+    if homework is not None:
+        db.session.delete(homework)
+        db.session.commit()
+
+def purge_course(course_id):
+    chunk_size = current_app.config['PURGE_CHUNK_SIZE']
+    homeworks = Homework.__table__
+    while True:
+        ids = [row[0] for row in db.session.query(homeworks.c.id)
+                                           .filter(homeworks.c.course_id==course_id)
+                                           .limit(chunk_size)]
+        if not ids:
+            break
+        for id in ids:
+            purge_homework(id)
+
+    delete_in_chunks(students_courses_table, 'course_id', course_id, chunk_size)
+    course = Course.query.options(db.noload('*')).get(course_id)
+    if course is not None:
+        db.session.delete(course)
+        db.session.commit()
+
+def purge_deleted():
+    for id, in db.session.query(Course.id).filter(Course.deleted_at.isnot(None)).all():
+        purge_course(id)
+    for id, in db.session.query(Homework.id).filter(Homework.deleted_at.isnot(None)).all():
+        purge_homework(id)
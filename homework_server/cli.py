@@ -0,0 +1,90 @@
+from functools import partial
+from time import perf_counter
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from . import db
+from .cleanup import purge_deleted
+from .dataset import SCALES, generate_dataset, seed_sample
+from .models import Administrator
+from .schema import upgrade_schema
+from .server import PreforkServer
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    created = upgrade_schema()
+    for name in created:
+        click.echo(f'created {name}')
+    click.echo(f'schema is up to date ({len(created)} objects created)')
+
+@click.command('purge-deleted')
+@with_appcontext
+def purge_deleted_command():
+    purge_deleted()
+    click.echo('deleted courses and homeworks purged')
+
+@click.command('init-db')
+@click.option('--admin-username', default=None, help='create this administrator if it does not exist')
+@click.option('--admin-password', default=None, envvar='ADMIN_PASSWORD')
+@with_appcontext
+def init_db_command(admin_username, admin_password):
+    created = upgrade_schema()
+    for name in created:
+        click.echo(f'created {name}')
+    if admin_username and Administrator.query.filter_by(username=admin_username).first() is None:
+        if not admin_password:
+            raise click.UsageError('--admin-password is required to create an administrator')
+        admin = Administrator()
+        admin.from_dict({'name': admin_username, 'username': admin_username, 'password': admin_password})
+        db.session.add(admin)
+        db.session.commit()
+        click.echo(f'created administrator {admin_username}')
+    click.echo(f'database is ready ({len(created)} schema objects created)')
+
+@click.command('seed')
+@click.option('--scale', type=click.Choice(sorted(SCALES)), default=None,
+              help='bulk-generate a synthetic dataset instead of the sample records')
+@click.option('--seed', type=int, default=0)
+@with_appcontext
+def seed_command(scale, seed):
+    start = perf_counter()
+    if scale is None:
+        created = seed_sample()
+        for name in created:
+            click.echo(f'created {name}')
+    else:
+        counts = generate_dataset(scale, seed)
+        for name, count in sorted(counts.items()):
+            click.echo(f'{name}: {count}')
+    click.echo(f'seeded in {perf_counter() - start:.2f}s')
+
+@click.command('serve')
+@click.option('--host', default='localhost')
+@click.option('--port', type=int, default=5000)
+@click.option('--config', 'config_name', envvar='CONFIG', default='development',
+              help='configuration each worker creates its app with')
+@click.option('--workers', type=int, default=None,
+              help='worker processes, one per core by default; with more than one, RESPONSE_CACHE=local '
+                   'is disabled and RESPONSE_CACHE=filesystem or redis is needed for response caching')
+@click.option('--threads', type=int, default=8, help='request threads per worker')
+@click.option('--graceful-timeout', type=float, default=30,
+              help='seconds a stopping worker gets to finish its requests')
+@with_appcontext
+def serve_command(host, port, config_name, workers, threads, graceful_timeout):
+    from . import create_app
+
+    app = current_app._get_current_object()
+    click.echo(f'app created in {app.extensions["startup_seconds"] * 1000:.1f} ms')
+    server = PreforkServer(partial(create_app, config_name), host, port,
+                           workers=workers, threads=threads, graceful_timeout=graceful_timeout)
+    server.serve_forever()
+
+def register_commands(app):
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(purge_deleted_command)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(serve_command)
@@ -0,0 +1,87 @@
+from functools import wraps
+from threading import Event, Lock
+
+from flask import current_app, make_response, request
+
+from .cache import request_fingerprint
+
+class Call:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.failed = False
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = Lock()
+        self.calls = {}
+
+    def waiters(self, key):
+        with self.lock:
+            call = self.calls.get(key)
+            return call.waiters if call is not None else 0
+
+    def do(self, key, func, timeout=None):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except BaseException:
+                call.failed = True
+                raise
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+            return call.result, 'leader'
+
+        if call.done.wait(timeout) and not call.failed:
+            return call.result, 'follower'
+        return func(), 'fallback'
+
+def init_coalescing(app):
+    app.extensions['single_flight'] = SingleFlight()
+    registry = app.extensions['metrics']
+    requests = registry.counter('coalesced_requests_total',
+                                'Requests to coalescing views by endpoint and how they were served',
+                                ['endpoint', 'result'])
+    app.extensions['coalesced_requests'] = requests
+
+    @registry.collector
+    def coalescing_ratio():
+        totals = {}
+        for (endpoint, result), value in requests.values().items():
+            total = totals.setdefault(endpoint, [0, 0])
+            total[0] += value if result == 'follower' else 0
+            total[1] += value
+        if totals:
+            yield 'request_coalescing_ratio', 'Share of requests served from another in-flight request', 'gauge', \
+                  [('request_coalescing_ratio', (('endpoint', endpoint),), round(shared / total, 6))
+                   for endpoint, (shared, total) in sorted(totals.items())]
+
+def coalesce(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if request.method not in ['GET', 'HEAD'] or not current_app.config['REQUEST_COALESCING']:
+            return f(*args, **kwargs)
+
+        def render():
+            response = make_response(f(*args, **kwargs))
+            return response.get_data(), response.status_code, response.mimetype
+
+        single_flight = current_app.extensions['single_flight']
+        (data, status, mimetype), result = single_flight.do(request_fingerprint(), render,
+                                                            current_app.config['REQUEST_COALESCING_TIMEOUT'])
+        current_app.extensions['coalesced_requests'].inc(endpoint=request.endpoint, result=result)
+        response = current_app.response_class(data, status=status, mimetype=mimetype)
+        response.headers['X-Coalesced'] = result
+        return response
+    return wrapper
\ No newline at end of file
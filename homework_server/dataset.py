@@ -0,0 +1,204 @@
+import math
+import os
+import random
+from datetime import datetime, timedelta
+
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+from . import db
+from .bulk import chunks
+from .models import Administrator, Course, Homework, Solution, Student, Teacher, User, \
+                    students_courses_table, students_homeworks_table
+from .schema import refresh_counters
+
+SCALES = {
+    'tiny': {
+        'teachers': 3,
+        'students': 50,
+        'courses': 6,
+        'homeworks_per_course': 4,
+        'courses_per_student': 2,
+        'homeworks_per_enrollment': 2,
+        'solution_rate': 0.5
+    },
+    'small': {
+        'teachers': 100,
+        'students': 10000,
+        'courses': 200,
+        'homeworks_per_course': 10,
+        'courses_per_student': 4,
+        'homeworks_per_enrollment': 3,
+        'solution_rate': 0.6
+    },
+    'medium': {
+        'teachers': 1000,
+        'students': 100000,
+        'courses': 2000,
+        'homeworks_per_course': 10,
+        'courses_per_student': 5,
+        'homeworks_per_enrollment': 3,
+        'solution_rate': 0.6
+    },
+    'large': {
+        'teachers': 5000,
+        'students': 1000000,
+        'courses': 10000,
+        'homeworks_per_course': 12,
+        'courses_per_student': 5,
+        'homeworks_per_enrollment': 4,
+        'solution_rate': 0.6
+    }
+}
+
+DATASET_PASSWORD = 'password'
+DATASET_EPOCH = datetime(2018, 9, 1)
+
+def insert_rows(table, rows, chunk_size):
+    count = 0
+    for chunk in chunks(rows, chunk_size):
+        db.session.execute(table.insert(), chunk)
+        count += len(chunk)
+    return count
+
+def insert_rows_returning_ids(table, rows, key, chunk_size):
+    ids = []
+    for chunk in chunks(rows, chunk_size):
+        db.session.execute(table.insert(), chunk)
+        values = [row[key] for row in chunk]
+        inserted = dict(db.session.query(table.c[key], table.c.id).filter(table.c[key].in_(values)))
+        ids.extend(inserted[value] for value in values)
+    return ids
+
+def generate_users(user_type, prefix, count, password_hash, chunk_size):
+    identity = user_type.__mapper__.polymorphic_identity
+    ids = insert_rows_returning_ids(User.__table__, [{
+        'type': identity,
+        'name': f'{prefix.title()} {i}',
+        'username': f'{prefix}{i}',
+        'password_hash': password_hash
+    } for i in range(count)], 'username', chunk_size)
+    insert_rows(user_type.__table__, [{'id': id} for id in ids], chunk_size)
+    return ids
+
+def generate_dataset(scale='small', seed=0, **overrides):
+    counts = dict(SCALES[scale], **overrides)
+    chunk_size = current_app.config['BULK_IMPORT_CHUNK_SIZE']
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(DATASET_PASSWORD)
+
+    if User.query.filter_by(username='admin').first() is None:
+        admin = Administrator()
+        admin.name = 'Admin'
+        admin.username = 'admin'
+        admin.password_hash = password_hash
+        db.session.add(admin)
+        db.session.flush()
+    teacher_ids = generate_users(Teacher, 'teacher', counts['teachers'], password_hash, chunk_size)
+    student_ids = generate_users(Student, 'student', counts['students'], password_hash, chunk_size)
+
+    course_ids = insert_rows_returning_ids(Course.__table__, [{
+        'name': f'course{i}',
+        'description': f'Course {i}',
+        'teacher_id': rng.choice(teacher_ids)
+    } for i in range(counts['courses'])], 'name', chunk_size)
+
+    per_student = min(counts['courses_per_student'], len(course_ids))
+    per_enrollment = min(counts['homeworks_per_enrollment'], counts['homeworks_per_course'])
+    expected_assignments = math.ceil(len(student_ids) * per_student / max(1, len(course_ids))
+                                     * per_enrollment / max(1, counts['homeworks_per_course']))
+
+    homework_rows = []
+    for i, course_id in enumerate(course_ids):
+        for j in range(counts['homeworks_per_course']):
+            homework_rows.append({
+                'name': f'homework{i}-{j}',
+                'description': f'Homework {j} of course {i}',
+                'deadline': DATASET_EPOCH + timedelta(days=rng.randint(0, 240), minutes=rng.randint(0, 1439)),
+                'headcount': expected_assignments * rng.randint(2, 4) + 10,
+                'self_assignable': rng.random() < 0.5,
+                'course_id': course_id
+            })
+    homework_ids = insert_rows_returning_ids(Homework.__table__, homework_rows, 'name', chunk_size)
+    course_homeworks = {course_id: [] for course_id in course_ids}
+    for row, homework_id in zip(homework_rows, homework_ids):
+        course_homeworks[row['course_id']].append(homework_id)
+
+    upload_folder = current_app.config['UPLOAD_FOLDER'] or 'uploads'
+    enrollments = []
+    assignments = []
+    solutions = []
+    totals = {'enrollments': 0, 'assignments': 0, 'solutions': 0}
+
+    def flush(force=False):
+        for table, rows, key in [(students_courses_table, enrollments, 'enrollments'),
+                                 (students_homeworks_table, assignments, 'assignments'),
+                                 (Solution.__table__, solutions, 'solutions')]:
+            if rows and (force or len(rows) >= chunk_size):
+                totals[key] += insert_rows(table, rows, chunk_size)
+                del rows[:]
+
+    for student_id in student_ids:
+        for course_id in rng.sample(course_ids, per_student):
+            enrollments.append({'student_id': student_id, 'course_id': course_id})
+            for homework_id in rng.sample(course_homeworks[course_id], per_enrollment):
+                assignments.append({'student_id': student_id, 'homework_id': homework_id})
+                if rng.random() < counts['solution_rate']:
+                    solutions.append({
+                        'homework_id': homework_id,
+                        'file_path': os.path.join(upload_folder, 'dataset', str(homework_id), f'{student_id}.txt'),
+                        'submitted_at': DATASET_EPOCH + timedelta(minutes=rng.randint(0, 240 * 24 * 60)),
+                        'status': rng.choice(['', 'accepted', 'rejected'])
+                    })
+        flush()
+    flush(force=True)
+
+    db.session.commit()
+    refresh_counters()
+
+    return dict(totals,
+                teachers=len(teacher_ids),
+                students=len(student_ids),
+                courses=len(course_ids),
+                homeworks=len(homework_rows))
+
+def seed_sample():
+    created = []
+    users = {}
+    for user_type, username in [(Administrator, 'admin'), (Teacher, 't'), (Student, 's')]:
+        user = user_type.query.filter_by(username=username).first()
+        if user is None:
+            user = user_type()
+            user.from_dict({'name': username, 'username': username, 'password': username})
+            db.session.add(user)
+            created.append(f'{user_type.__tablename__[:-1]} {username}')
+        users[username] = user
+    db.session.flush()
+
+    course = Course.query.filter_by(name='c').first()
+    if course is None:
+        course = Course()
+        course.from_dict({'name': 'c', 'description': 'c'})
+        course.teacher_id = users['t'].id
+        db.session.add(course)
+        db.session.flush()
+        course.add_student(users['s'].id)
+        created.append('course c')
+
+    if Homework.query.filter_by(name='h').first() is None:
+        homework = Homework()
+        homework.from_dict({
+            'name': 'h',
+            'description': 'h',
+            'deadline': datetime.utcnow(),
+            'headcount': 4,
+            'self_assignable': False
+        })
+        homework.course_id = course.id
+        db.session.add(homework)
+        db.session.flush()
+        homework.add_student(users['s'].id)
+        created.append('homework h')
+
+    db.session.commit()
+    return created
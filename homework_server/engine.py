@@ -0,0 +1,107 @@
+import weakref
+
+from flask_sqlalchemy import BaseQuery, SQLAlchemy, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.pool import QueuePool
+
+from .replicas import REPLICA_BIND_PREFIX, RoutingSession
+
+def is_sqlite_memory(url):
+    return url.drivername.startswith('sqlite') and url.database in (None, '', ':memory:')
+
+def engine_profile(app, url):
+    profiles = app.config['DATABASE_ENGINE_PROFILES']
+    return profiles.get(url.get_backend_name(), profiles['default'])
+
+def apply_pragmas(app, engine):
+    pragmas = engine_profile(app, engine.url).get('pragmas')
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+def pool_statistics(engine):
+    pool = engine.pool
+    stats = {
+        'pool': type(pool).__name__,
+        'status': pool.status()
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow()
+        })
+    return stats
+
+class Query(BaseQuery):
+    def __iter__(self):
+        if self._has_mapper_entities and not self._with_options and self.session.info.get('raiseload'):
+            return BaseQuery.__iter__(self.options(orm.raiseload('*')))
+        return super(Query, self).__iter__()
+
+class Database(SQLAlchemy):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('query_class', Query)
+        super(Database, self).__init__(*args, **kwargs)
+        self.engine_hooks = [apply_pragmas]
+        self._configured_engines = weakref.WeakSet()
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_RAISELOAD', False)
+        super(Database, self).init_app(app)
+
+        @app.before_request
+        def enable_raiseload():
+            if app.config['SQLALCHEMY_RAISELOAD']:
+                self.session.info['raiseload'] = True
+
+        @app.teardown_request
+        def disable_raiseload(exc):
+            self.session.info.pop('raiseload', None)
+
+    def engine_hook(self, func):
+        self.engine_hooks.append(func)
+        return func
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, info, options):
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        if not is_sqlite_memory(info):
+            for key, value in engine_profile(app, info).get('pool', {}).items():
+                options.setdefault(key, value)
+            if info.drivername.startswith('sqlite') and options.get('pool_size'):
+                options.setdefault('poolclass', QueuePool)
+                options.setdefault('connect_args', {})['check_same_thread'] = False
+        super(Database, self).apply_driver_hacks(app, info, options)
+
+    def _execute_for_all_tables(self, app, bind, operation, skip_tables=False):
+        app = self.get_app(app)
+        if bind == '__all__':
+            binds = app.config.get('SQLALCHEMY_BINDS') or ()
+            bind = [None] + [key for key in binds if not key.startswith(REPLICA_BIND_PREFIX)]
+        super(Database, self)._execute_for_all_tables(app, bind, operation, skip_tables)
+
+    def get_engine(self, app=None, bind=None):
+        engine = super(Database, self).get_engine(app, bind)
+        with self._engine_lock:
+            if engine not in self._configured_engines:
+                self._configured_engines.add(engine)
+                for hook in self.engine_hooks:
+                    hook(self.get_app(app), engine)
+        return engine
+
+    def get_engines(self, app=None):
+        app = self.get_app(app)
+        return {bind: self.get_engine(app, bind) for bind in list(get_state(app).connectors)}
+
+    def pool_statistics(self, app=None):
+        return {bind or 'default': pool_statistics(engine) for bind, engine in self.get_engines(app).items()}
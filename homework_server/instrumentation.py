@@ -0,0 +1,133 @@
+from threading import Lock
+from time import perf_counter
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from . import db
+from .cache import LRUCache
+from .jobs import enqueue
+
+class SlowQueryLog:
+    def __init__(self, max_statements=1024):
+        self.seen = LRUCache(max_statements, default_timeout=0)
+        self.plans = LRUCache(max_statements, default_timeout=0)
+        self.lock = Lock()
+
+    def first_seen(self, statement):
+        with self.lock:
+            if self.seen.get(statement) is not None:
+                return False
+            self.seen.set(statement, True)
+            return True
+
+def get_slow_query_log(app=None):
+    return (app or current_app).extensions['slow_queries']
+
+def parameter_shape(parameters):
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters]
+
+EXPLAINABLE_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+def capture_plan(statement, parameters):
+    if isinstance(db.engine.pool, (SingletonThreadPool, StaticPool)):
+        return
+    with db.engine.connect() as connection:
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+        rows = connection.execute(prefix + statement, parameters).fetchall()
+    plan = '\n'.join(' '.join(str(value) for value in row) for row in rows)
+    get_slow_query_log().plans.set(statement, plan)
+    current_app.logger.warning('query plan for slow query: %s\n%s', statement, plan,
+                               extra={'sql': statement, 'plan': plan})
+
+def log_slow_query(statement, parameters, executemany, elapsed):
+    if statement.lstrip().upper().startswith('EXPLAIN'):
+        return
+    endpoint = request.endpoint if has_request_context() else None
+    if executemany:
+        shape = {'rows': len(parameters), 'shape': parameter_shape(parameters[0]) if parameters else []}
+    else:
+        shape = parameter_shape(parameters)
+    current_app.logger.warning('slow query (%.2f ms) from %s: %s %s',
+                               elapsed * 1000, endpoint, statement, shape,
+                               extra={
+                                   'sql': statement,
+                                   'parameters': shape,
+                                   'endpoint': endpoint,
+                                   'duration_ms': round(elapsed * 1000, 2)
+                               })
+
+    if not statement.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS):
+        return
+    if not get_slow_query_log().first_seen(statement):
+        return
+    job = (statement, parameters[0] if executemany else parameters)
+    if has_request_context():
+        g.setdefault('slow_query_plans', []).append(job)
+    else:
+        enqueue(capture_plan, *job)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = perf_counter() - conn.info['query_start_time'].pop()
+    if has_request_context() and 'sql_stats' in g:
+        g.sql_stats['queries'] += 1
+        g.sql_stats['time'] += elapsed
+    if has_app_context():
+        threshold = current_app.config['SLOW_QUERY_THRESHOLD_MS']
+        if threshold is not None and elapsed * 1000 >= threshold:
+            log_slow_query(statement, parameters, executemany, elapsed)
+
+def instrument_engine(engine):
+    if not event.contains(engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+def server_timing(stats, total):
+    return ', '.join([
+        f'db;dur={stats["time"] * 1000:.2f};desc="{stats["queries"]} queries"',
+        f'app;dur={total * 1000:.2f}'
+    ])
+
+def init_instrumentation(app):
+    app.extensions['slow_queries'] = SlowQueryLog()
+
+    @app.before_request
+    def start_instrumentation():
+        config = current_app.config
+        if not config['SQL_INSTRUMENTATION'] and config['SLOW_QUERY_THRESHOLD_MS'] is None:
+            return
+        for engine in db.get_engines().values():
+            instrument_engine(engine)
+        if config['SQL_INSTRUMENTATION']:
+            g.sql_stats = {'queries': 0, 'time': 0.0, 'start': perf_counter()}
+
+    @app.after_request
+    def emit_server_timing(response):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return response
+        total = perf_counter() - stats['start']
+        response.headers['Server-Timing'] = server_timing(stats, total)
+        current_app.logger.info('%s %s %s sql_queries=%d sql_time_ms=%.2f total_ms=%.2f',
+                                request.method, request.path, response.status_code,
+                                stats['queries'], stats['time'] * 1000, total * 1000,
+                                extra={
+                                    'method': request.method,
+                                    'path': request.path,
+                                    'status': response.status_code,
+                                    'sql_queries': stats['queries'],
+                                    'sql_time_ms': round(stats['time'] * 1000, 2),
+                                    'total_ms': round(total * 1000, 2)
+                                })
+        return response
+
+    @app.teardown_request
+    def capture_slow_query_plans(exc):
+        for job in g.pop('slow_query_plans', []):
+            enqueue(capture_plan, *job)
@@ -0,0 +1,66 @@
+import queue
+from threading import Lock, Thread
+
+from flask import current_app, has_app_context
+
+from . import db
+
+class JobQueue:
+    def __init__(self, app):
+        self.app = app
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = Lock()
+
+    def enqueue(self, func, *args):
+        mode = self.app.config['JOBS_MODE']
+        if mode == 'eager':
+            self.run(func, args)
+            return
+        self.queue.put((func, args))
+        if mode == 'thread':
+            self.start()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self.work, name='homework-server-jobs', daemon=True)
+                self.thread.start()
+
+    def work(self):
+        while True:
+            func, args = self.queue.get()
+            self.run(func, args)
+            self.queue.task_done()
+
+    def run(self, func, args):
+        if has_app_context() and current_app._get_current_object() is self.app:
+            self.call(func, args)
+        else:
+            with self.app.app_context():
+                self.call(func, args)
+
+    def call(self, func, args):
+        try:
+            func(*args)
+        except Exception:
+            db.session.rollback()
+            self.app.logger.exception('job %s%r failed', func.__name__, args)
+
+    def run_pending(self):
+        while True:
+            try:
+                func, args = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            self.run(func, args)
+            self.queue.task_done()
+
+def init_jobs(app):
+    app.extensions['jobs'] = JobQueue(app)
+
+def get_job_queue(app=None):
+    return (app or current_app).extensions['jobs']
+
+def enqueue(func, *args):
+    get_job_queue().enqueue(func, *args)
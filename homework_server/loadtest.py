@@ -0,0 +1,199 @@
+import base64
+import json
+import random
+import uuid
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from .benchmark import percentile
+from .dataset import DATASET_PASSWORD
+from .server import PreforkServer
+
+MIXES = {
+    'semester-start': {'login': 6, 'poll': 3, 'submit': 1},
+    'polling': {'login': 1, 'poll': 8, 'submit': 1},
+    'deadline': {'login': 1, 'poll': 2, 'submit': 7}
+}
+
+class LoadClient:
+    def __init__(self, base_url, username, recorder, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.recorder = recorder
+        self.timeout = timeout
+        self.token = None
+        self.homeworks = None
+
+    def request(self, method, route, path, body=None, headers=None):
+        request = Request(self.base_url + path, data=body, method=method, headers=headers or {})
+        start = perf_counter()
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                status, data = response.status, response.read()
+        except HTTPError as e:
+            status, data = e.code, e.read()
+        except (URLError, OSError):
+            status, data = None, b''
+        self.recorder.record(f'{method} {route}', perf_counter() - start, status)
+        return status, data
+
+    def auth_headers(self):
+        if self.token is None:
+            self.login()
+        return {'Authorization': f'Bearer {self.token}'}
+
+    def login(self):
+        credentials = base64.b64encode(f'{self.username}:{DATASET_PASSWORD}'.encode()).decode('utf-8')
+        status, data = self.request('POST', '/api/v1/auth/token', '/api/v1/auth/token',
+                                    headers={'Authorization': f'Basic {credentials}'})
+        if status == 200:
+            self.token = json.loads(data.decode())['token']
+
+    def poll(self):
+        headers = self.auth_headers()
+        status, data = self.request('GET', '/api/v1/student/homeworks', '/api/v1/student/homeworks', headers=headers)
+        if status == 200:
+            self.homeworks = [homework['id'] for homework in json.loads(data.decode())['homeworks']]
+        self.request('GET', '/api/v1/student/courses', '/api/v1/student/courses', headers=headers)
+
+    def submit(self, rng):
+        if self.homeworks is None:
+            self.poll()
+        if not self.homeworks:
+            return
+        boundary = uuid.uuid4().hex
+        body = '\r\n'.join([
+            f'--{boundary}',
+            f'Content-Disposition: form-data; name="file"; filename="{self.username}.txt"',
+            'Content-Type: text/plain',
+            '',
+            f'solution by {self.username}',
+            f'--{boundary}--',
+            ''
+        ]).encode()
+        headers = dict(self.auth_headers(), **{'Content-Type': f'multipart/form-data; boundary={boundary}'})
+        homework_id = rng.choice(self.homeworks)
+        self.request('POST', '/api/v1/student/homework/<id>/submit', f'/api/v1/student/homework/{homework_id}/submit',
+                     body=body, headers=headers)
+
+class Recorder:
+    def __init__(self):
+        self.lock = Lock()
+        self.samples = {}
+
+    def record(self, route, elapsed, status):
+        with self.lock:
+            self.samples.setdefault(route, []).append((elapsed, status))
+
+def summarize(samples, duration):
+    routes = {}
+    for route, route_samples in sorted(samples.items()):
+        latencies = [elapsed for elapsed, _ in route_samples]
+        errors = sum(1 for _, status in route_samples if status is None or status >= 400)
+        routes[route] = {
+            'requests': len(route_samples),
+            'errors': errors,
+            'error_rate': round(errors / len(route_samples), 4),
+            'throughput': round(len(route_samples) / duration, 2),
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3)
+        }
+    total = sum(route['requests'] for route in routes.values())
+    errors = sum(route['errors'] for route in routes.values())
+    return {
+        'duration': round(duration, 3),
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0,
+        'throughput': round(total / duration, 2) if duration else 0,
+        'routes': routes
+    }
+
+def run_load(base_url, mix, workers=8, duration=None, iterations=None, users=100, seed=0):
+    weights = MIXES[mix] if isinstance(mix, str) else mix
+    scenarios = sorted(weights)
+    recorder = Recorder()
+    start = perf_counter()
+
+    def work(worker):
+        rng = random.Random(seed * 1000 + worker)
+        clients = {}
+        count = 0
+        while True:
+            if iterations is not None and count >= iterations:
+                return
+            if duration is not None and perf_counter() - start >= duration:
+                return
+            count += 1
+            username = f'student{rng.randrange(users)}'
+            client = clients.get(username)
+            if client is None:
+                client = clients[username] = LoadClient(base_url, username, recorder)
+            scenario = rng.choices(scenarios, [weights[name] for name in scenarios])[0]
+            if scenario == 'login':
+                client.login()
+            elif scenario == 'poll':
+                client.poll()
+            else:
+                client.submit(rng)
+
+    threads = [Thread(target=work, args=(worker,), daemon=True) for worker in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = summarize(recorder.samples, perf_counter() - start)
+    results.update({'mix': weights, 'workers': workers, 'users': users, 'seed': seed})
+    return results
+
+def format_report(results):
+    lines = [f'{results["requests"]} requests in {results["duration"]:.1f}s, '
+             f'{results["throughput"]:.1f} req/s, error rate {results["error_rate"] * 100:.2f}%',
+             f'{"route":52} {"requests":>8} {"req/s":>8} {"errors":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}']
+    for route, result in results['routes'].items():
+        lines.append(f'{route:52} {result["requests"]:8d} {result["throughput"]:8.1f} {result["errors"]:7d} '
+                     f'{result["p50"]:9.2f} {result["p95"]:9.2f} {result["p99"]:9.2f}')
+    return '\n'.join(lines)
+
+def wait_until_ready(base_url, timeout=30):
+    deadline = perf_counter() + timeout
+    while True:
+        try:
+            with urlopen(base_url, timeout=1):
+                return
+        except HTTPError:
+            return
+        except (URLError, OSError):
+            if perf_counter() >= deadline:
+                raise
+            sleep(0.05)
+
+def run_scaling(app_factory, worker_counts, mix, threads=8, host='127.0.0.1', **load_options):
+    results = []
+    for workers in worker_counts:
+        server = PreforkServer(app_factory, host, 0, workers=workers, threads=threads)
+        server.start()
+        try:
+            base_url = f'http://{host}:{server.port}'
+            wait_until_ready(base_url)
+            result = run_load(base_url, mix, **load_options)
+        finally:
+            server.stop()
+        result.update({'server_workers': workers, 'server_threads': threads})
+        results.append(result)
+    return results
+
+def format_scaling(results):
+    base = results[0]['throughput'] if results and results[0]['throughput'] else None
+    lines = [f'{"workers":>7} {"req/s":>9} {"speedup":>8} {"errors":>7} {"max p50":>9} {"max p99":>9}']
+    for result in results:
+        latencies = [route['p50'] for route in result['routes'].values()]
+        tails = [route['p99'] for route in result['routes'].values()]
+        speedup = result['throughput'] / base if base else 0
+        lines.append(f'{result["server_workers"]:7d} {result["throughput"]:9.1f} {speedup:7.2f}x {result["errors"]:7d} '
+                     f'{max(latencies, default=0):9.2f} {max(tails, default=0):9.2f}')
+    return '\n'.join(lines)
\ No newline at end of file
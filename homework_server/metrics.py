@@ -0,0 +1,185 @@
+import weakref
+from bisect import bisect_left
+from threading import Lock, current_thread, local
+from time import perf_counter
+
+from flask import current_app, g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = local()
+        self._shards = {}
+        self._retired = {}
+        self._lock = Lock()
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards[id(shard)] = shard
+            weakref.finalize(current_thread(), self.retire, shard)
+            return shard
+
+    def retire(self, shard):
+        with self._lock:
+            del self._shards[id(shard)]
+            for key, value in shard.items():
+                self._retired[key] = self.merge(self._retired.get(key), value)
+
+    def label_values(self, labels):
+        return tuple(labels[name] for name in self.labels)
+
+    def values(self):
+        with self._lock:
+            shards = list(self._shards.values())
+            merged = {key: self.merge(None, value) for key, value in self._retired.items()}
+        for shard in shards:
+            for key, value in list(shard.items()):
+                merged[key] = self.merge(merged.get(key), value)
+        return merged
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self.shard()
+        key = self.label_values(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def merge(self, total, value):
+        return (total or 0) + value
+
+    def samples(self):
+        for key, value in sorted(self.values().items()):
+            yield self.name, tuple(zip(self.labels, key)), value
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        shard = self.shard()
+        key = self.label_values(labels)
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = [[0] * len(self.buckets), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def merge(self, total, value):
+        if total is None:
+            return [list(value[0]), value[1], value[2]]
+        return [[a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2]]
+
+    def samples(self):
+        for key, (counts, sum, count) in sorted(self.values().items()):
+            labels = tuple(zip(self.labels, key))
+            cumulative = 0
+            for bucket, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', labels + (('le', format_value(bucket)),), cumulative
+            yield f'{self.name}_sum', labels, sum
+            yield f'{self.name}_count', labels, count
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def collector(self, func):
+        self.collectors.append(func)
+        return func
+
+    def collect(self):
+        for metric in self.metrics:
+            yield metric.name, metric.help, metric.type, list(metric.samples())
+        for collector in self.collectors:
+            for family in collector():
+                yield family
+
+    def render(self):
+        lines = []
+        for name, help, type, samples in self.collect():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {type}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+def pool_gauges(db):
+    def collect():
+        statistics = db.pool_statistics()
+        for field in ['size', 'checked_in', 'checked_out', 'overflow']:
+            samples = [(f'db_pool_{field}', (('bind', bind),), stats[field])
+                       for bind, stats in sorted(statistics.items()) if field in stats]
+            if samples:
+                yield f'db_pool_{field}', f'Database connection pool {field.replace("_", " ")}', 'gauge', samples
+    return collect
+
+def init_metrics(app, db):
+    registry = app.extensions['metrics'] = MetricsRegistry()
+    requests = registry.counter('http_requests_total', 'HTTP requests by endpoint and status',
+                                ['endpoint', 'method', 'status'])
+    latency = registry.histogram('http_request_duration_seconds', 'HTTP request latency by endpoint',
+                                 ['endpoint'])
+    registry.collector(pool_gauges(db))
+
+    @registry.collector
+    def startup_time():
+        yield 'app_startup_seconds', 'Time spent in create_app', 'gauge', \
+              [('app_startup_seconds', (), round(app.extensions.get('startup_seconds', 0), 6))]
+
+    @app.before_request
+    def start_timer():
+        if current_app.config['METRICS_ENABLED']:
+            g.metrics_start = perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or 'unknown'
+        requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        latency.observe(perf_counter() - start, endpoint=endpoint)
+        return response
+
+def get_metrics(app=None):
+    return (app or current_app).extensions['metrics']
@@ -2,20 +2,76 @@ from datetime import datetime, timedelta
 
 from flask import current_app
 from itsdangerous import TimedJSONWebSignatureSerializer
+from sqlalchemy import event
+from sqlalchemy.sql.expression import ClauseElement
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from . import db
 
 students_homeworks_table = db.Table('students_homeworks',
     db.Column('student_id', db.Integer, db.ForeignKey('students.id'), primary_key=True),
-    db.Column('homework_id', db.Integer, db.ForeignKey('homeworks.id'), primary_key=True)
+    db.Column('homework_id', db.Integer, db.ForeignKey('homeworks.id'), primary_key=True),
+    db.Index('ix_students_homeworks_homework_id_student_id', 'homework_id', 'student_id')
 )
 
 students_courses_table = db.Table('students_courses',
     db.Column('student_id', db.Integer, db.ForeignKey('students.id'), primary_key=True),
-    db.Column('course_id', db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+    db.Column('course_id', db.Integer, db.ForeignKey('courses.id'), primary_key=True),
+    db.Index('ix_students_courses_course_id_student_id', 'course_id', 'student_id')
 )
 
+def has_student(table, key, value, student_id):
+    member = db.exists().where(db.and_(table.c.student_id==student_id, table.c[key]==value))
+    return db.session.query(member).scalar()
+
+def add_students(table, key, value, student_ids):
+    if not student_ids:
+        return 0
+    students = Student.__table__
+    member = db.exists().where(db.and_(table.c.student_id==students.c.id, table.c[key]==value))
+    rows = db.select([students.c.id, db.literal(value)]) \
+             .where(students.c.id.in_(student_ids)) \
+             .where(~member)
+    return db.session.execute(table.insert().from_select(['student_id', key], rows)).rowcount
+
+def remove_student(table, key, value, student_id):
+    statement = table.delete().where(db.and_(table.c.student_id==student_id, table.c[key]==value))
+    return db.session.execute(statement).rowcount == 1
+
+def increment_counter(model, id, counter, delta, limit=None):
+    table = model.__table__
+    column = table.c[counter]
+    statement = table.update().where(table.c.id==id).values({counter: column + delta})
+    if limit is not None and delta > 0:
+        statement = statement.where(column + delta <= limit)
+    return db.session.execute(statement).rowcount == 1
+
+def tombstone_name(table):
+    suffix = db.literal('~deleted~') + db.cast(table.c.id, db.String)
+    return db.func.substr(table.c.name, 1, table.c.name.type.length - db.func.length(suffix)) + suffix
+
+def bump_counter(target, counter, delta):
+    value = target.__dict__.get(counter)
+    if db.inspect(target).has_identity:
+        if not isinstance(value, ClauseElement):
+            value = getattr(type(target), counter)
+        setattr(target, counter, value + delta)
+    else:
+        setattr(target, counter, (value or 0) + delta)
+
+def count_collection(attribute, counter, owner):
+    def append(target, value, initiator):
+        bump_counter(owner(target, value), counter, 1)
+
+    def remove(target, value, initiator):
+        bump_counter(owner(target, value), counter, -1)
+
+    event.listen(attribute, 'append', append)
+    event.listen(attribute, 'remove', remove)
+
+class HeadcountExceeded(Exception):
+    pass
+
 class User(db.Model):
     __tablename__ = 'users'
 
@@ -27,6 +83,8 @@ class User(db.Model):
     token = db.Column(db.String(64), unique=True)
     token_expiration = db.Column(db.DateTime)
 
+    cache_ignored_columns = ('password_hash', 'token', 'token_expiration')
+
     __mapper_args__ = {
         'polymorphic_identity': 'users',
         'polymorphic_on': type
@@ -112,14 +170,40 @@ class Student(User):
         'polymorphic_identity': 'students',
     }
 
+    @staticmethod
+    def resolve(refs):
+        ids = {ref for ref in refs if type(ref) == int}
+        usernames = {ref for ref in refs if isinstance(ref, str)}
+        users = User.__table__
+        conditions = []
+        if ids:
+            conditions.append(users.c.id.in_(ids))
+        if usernames:
+            conditions.append(users.c.username.in_(usernames))
+        if not conditions:
+            return {}
+        students = Student.__table__
+        rows = db.session.query(users.c.id, users.c.username) \
+                         .join(students, students.c.id==users.c.id) \
+                         .filter(db.or_(*conditions))
+        resolved = {}
+        for id, username in rows:
+            if id in ids:
+                resolved[id] = id
+            if username in usernames:
+                resolved[username] = id
+        return resolved
+
 class Course(db.Model):
     __tablename__ = 'courses'
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), unique=True, nullable=False)
     description = db.Column(db.String(256), nullable=False)
+    student_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    deleted_at = db.Column(db.DateTime)
 
-    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id'))
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teachers.id'), index=True)
     homeworks = db.relationship('Homework', backref='course', lazy=True, cascade='all, delete-orphan')
     students = db.relationship('Student',
                                secondary=students_courses_table,
@@ -134,7 +218,8 @@ class Course(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'teacher': teacher_name
+            'teacher': teacher_name,
+            'student_count': self.student_count
         }
 
     def from_dict(self, data):
@@ -142,14 +227,46 @@ class Course(db.Model):
             if field in data:
                 setattr(self, field, data[field])
 
+    def mark_deleted(self):
+        now = datetime.utcnow()
+        homeworks = Homework.__table__
+        db.session.execute(homeworks.update()
+                                    .where(db.and_(homeworks.c.course_id==self.id, homeworks.c.deleted_at.is_(None)))
+                                    .values(deleted_at=now, name=tombstone_name(homeworks)))
+        self.deleted_at = now
+        if db.inspect(self).has_identity:
+            self.name = tombstone_name(Course.__table__)
+
+    def has_student(self, student_id):
+        return has_student(students_courses_table, 'course_id', self.id, student_id)
+
+    def add_student(self, student_id):
+        return self.add_students([student_id]) == 1
+
+    def add_students(self, student_ids):
+        added = add_students(students_courses_table, 'course_id', self.id, student_ids)
+        if added:
+            increment_counter(Course, self.id, 'student_count', added)
+        db.session.expire(self, ['students', 'students_courses', 'student_count'])
+        return added
+
+    def remove_student(self, student_id):
+        removed = remove_student(students_courses_table, 'course_id', self.id, student_id)
+        if removed:
+            increment_counter(Course, self.id, 'student_count', -1)
+        db.session.expire(self, ['students', 'students_courses', 'student_count'])
+        return removed
+
 class Homework(db.Model):
     __tablename__ = 'homeworks'
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), unique=True, nullable=False)
     description = db.Column(db.String(256), nullable=False)
-    deadline = db.Column(db.DateTime, nullable=False)
+    deadline = db.Column(db.DateTime, nullable=False, index=True)
     headcount = db.Column(db.Integer, nullable=False)
+    assigned_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    deleted_at = db.Column(db.DateTime)
     self_assignable = db.Column(db.Boolean, nullable=False, default=False)
 
     course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
@@ -159,9 +276,14 @@ class Homework(db.Model):
                                backref='students_homeworks'
                               )
 
-    def to_dict(self):
-        course = Course.query.filter_by(id=self.course_id).first()
-        course_name = course.name if course is not None else None
+    __table_args__ = (
+        db.Index('ix_homeworks_course_id_name', 'course_id', 'name'),
+    )
+
+    def to_dict(self, course_name=None):
+        if course_name is None:
+            course = Course.query.filter_by(id=self.course_id).first()
+            course_name = course.name if course is not None else None
 
         return {
             'id': self.id,
@@ -169,6 +291,7 @@ class Homework(db.Model):
             'description': self.description,
             'deadline': self.deadline.strftime('%Y-%m-%d %H:%M:%S'),
             'headcount': self.headcount,
+            'assigned_count': self.assigned_count,
             'self_assignable': self.self_assignable,
             'course': course_name
         }
@@ -195,10 +318,86 @@ class Homework(db.Model):
                 self.self_assignable = data['self_assignable']
             elif type(data['self_assignable']) == str and data['self_assignable'].lower() in ['true', 'false']:
                 self.self_assignable = (data['self_assignable'].lower() == 'true')
-        if 'students' in data:
-            for id in data['students']:
-                student = Student.query.filter_by(id=id).first()
-                self.students.append(student)
+
+    def mark_deleted(self):
+        self.deleted_at = datetime.utcnow()
+        if db.inspect(self).has_identity:
+            self.name = tombstone_name(Homework.__table__)
+
+    def has_student(self, student_id):
+        return has_student(students_homeworks_table, 'homework_id', self.id, student_id)
+
+    def add_student(self, student_id):
+        added = add_students(students_homeworks_table, 'homework_id', self.id, [student_id]) == 1
+        if added and not increment_counter(Homework, self.id, 'assigned_count', 1, Homework.__table__.c.headcount):
+            raise HeadcountExceeded()
+        db.session.expire(self, ['students', 'students_homeworks', 'assigned_count'])
+        return added
+
+    def remove_student(self, student_id):
+        removed = remove_student(students_homeworks_table, 'homework_id', self.id, student_id)
+        if removed:
+            increment_counter(Homework, self.id, 'assigned_count', -1)
+        db.session.expire(self, ['students', 'students_homeworks', 'assigned_count'])
+        return removed
+
+    def assign_students(self, students):
+        if isinstance(students, dict):
+            replace = 'set' in students
+            requested = [students.get(key) or [] for key in ['set', 'add', 'remove']]
+        else:
+            replace = True
+            requested = [students, [], []]
+
+        errors = {}
+        to_set, to_add, to_remove = set(), set(), set()
+        for ids, l in zip([to_set, to_add, to_remove], requested):
+            if not isinstance(l, list):
+                errors['students'] = 'expected a list of ids'
+                continue
+            for id in l:
+                if type(id) != int:
+                    errors[str(id)] = 'invalid id'
+                else:
+                    ids.add(id)
+
+        requested_ids = to_set | to_add | to_remove
+        if requested_ids:
+            student_ids = Student.__table__.c.id
+            known = {row[0] for row in db.session.query(student_ids).filter(student_ids.in_(requested_ids))}
+            for id in sorted(requested_ids - known):
+                errors[str(id)] = 'unknown student'
+        if errors:
+            return None, errors
+
+        if self.id is None:
+            db.session.add(self)
+            db.session.flush()
+            current = set()
+        else:
+            current = {row[0] for row in db.session.query(students_homeworks_table.c.student_id)
+                                                   .filter(students_homeworks_table.c.homework_id==self.id)}
+
+        target = (to_set if replace else current) | to_add
+        target -= to_remove
+        added = sorted(target - current)
+        removed = sorted(current - target)
+
+        if removed:
+            deleted = db.session.execute(students_homeworks_table.delete().where(db.and_(
+                students_homeworks_table.c.homework_id==self.id,
+                students_homeworks_table.c.student_id.in_(removed)
+            ))).rowcount
+            if deleted:
+                increment_counter(Homework, self.id, 'assigned_count', -deleted)
+        if added:
+            inserted = add_students(students_homeworks_table, 'homework_id', self.id, added)
+            if inserted and not increment_counter(Homework, self.id, 'assigned_count', inserted,
+                                                  Homework.__table__.c.headcount):
+                return None, {'students': 'headcount exceeded'}
+        db.session.expire(self, ['students', 'students_homeworks', 'assigned_count'])
+
+        return {'added': added, 'removed': removed}, {}
 
 class Solution(db.Model):
     __tablename__ = 'solutions'
@@ -209,6 +408,13 @@ class Solution(db.Model):
     status = db.Column(db.String(512), default='')
 
     homework_id = db.Column(db.Integer, db.ForeignKey('homeworks.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='SET NULL'))
+
+    __table_args__ = (
+        db.Index('ix_solutions_homework_id_submitted_at', 'homework_id', 'submitted_at'),
+        db.Index('ix_solutions_homework_id_student_id', 'homework_id', 'student_id'),
+        db.Index('ix_solutions_homework_id_status', 'homework_id', 'status'),
+    )
 
     def to_dict(self):
         return {
@@ -219,4 +425,9 @@ class Solution(db.Model):
 
     def from_dict(self, data):
         if 'status' in data:
-            self.status = data['status']
\ No newline at end of file
+            self.status = data['status']
+
+count_collection(Course.students, 'student_count', lambda course, student: course)
+count_collection(Student.courses, 'student_count', lambda student, course: course)
+count_collection(Homework.students, 'assigned_count', lambda homework, student: homework)
+count_collection(Student.homeworks, 'assigned_count', lambda student, homework: homework)
\ No newline at end of file
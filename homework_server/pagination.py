@@ -1,26 +1,89 @@
+from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import url_for
+from flask import request, url_for
 from flask_sqlalchemy import BaseQuery
+from sqlalchemy import and_, or_
+
+MAX_PAGE_SIZE = 100
+MAX_WINDOW_DAYS = 366
 
 class PaginatedQuery:
-    def __init__(self, query, size, url_id, key, start=1, limit=25):
+    def __init__(self, query, size, url_id, key, start=1, limit=25, url_args=None, serialize=None):
         self.query = query
         self.size = size
         self.start = start
         self.limit = limit
         self.url_id = url_id
         self.key = key
+        self.url_args = url_args or {}
+        self.serialize = serialize or (lambda item: item.to_dict())
 
     def execute(self):
         items = self.query.paginate(self.start, self.limit, False).items
-        url_next = url_for(self.url_id, **{'start': self.start + 1, 'limit': self.limit}) \
+        url_next = url_for(self.url_id, **dict(self.url_args, start=self.start + 1, limit=self.limit)) \
                     if self.size > (self.start * self.limit) else None
-        url_prev = url_for(self.url_id, **{'start': self.start - 1, 'limit': self.limit}) \
+        url_prev = url_for(self.url_id, **dict(self.url_args, start=self.start - 1, limit=self.limit)) \
                     if ((self.start - 1) * self.limit) > 0 else None
 
         return {
-            self.key: [item.to_dict() for item in items],
+            self.key: [self.serialize(item) for item in items],
             'next': url_next,
             'prev': url_prev
-        }
\ No newline at end of file
+        }
+
+def encode_cursor(values):
+    return ','.join(value.isoformat() if isinstance(value, datetime) else str(value) for value in values)
+
+def decode_cursor(columns, cursor):
+    values = cursor.split(',')
+    if len(values) != len(columns):
+        raise ValueError(f'invalid cursor {cursor!r}')
+    return [datetime.fromisoformat(value) if column.type.python_type is datetime else column.type.python_type(value)
+            for column, value in zip(columns, values)]
+
+def keyset_after(columns, values):
+    conditions = [and_(*[column==value for column, value in zip(columns[:i], values[:i])], columns[i] > values[i])
+                  for i in range(len(columns))]
+    return and_(columns[0] >= values[0], or_(*conditions))
+
+class KeysetQuery:
+    def __init__(self, query, columns, cursor, url_id, key, after=None, limit=25, url_args=None, serialize=None):
+        self.query = query
+        self.columns = columns
+        self.cursor = cursor
+        self.url_id = url_id
+        self.key = key
+        self.after = after
+        self.limit = limit
+        self.url_args = url_args or {}
+        self.serialize = serialize or (lambda item: item.to_dict())
+
+    def execute(self):
+        query = self.query
+        if self.after is not None:
+            query = query.filter(keyset_after(self.columns, self.after))
+        items = query.order_by(*self.columns).limit(self.limit + 1).all()
+        url_next = None
+        if len(items) > self.limit:
+            items = items[:self.limit]
+            url_next = url_for(self.url_id, **dict(self.url_args, after=encode_cursor(self.cursor(items[-1])),
+                                                   limit=self.limit))
+
+        return {
+            self.key: [self.serialize(item) for item in items],
+            'next': url_next
+        }
+
+def paginate_window(query, columns, cursor, url_id, key, serialize=None, default_days=7):
+    within = request.args.get('within', default_days, type=int)
+    limit = request.args.get('limit', 25, type=int)
+    if not 0 <= within <= MAX_WINDOW_DAYS or not 1 <= limit <= MAX_PAGE_SIZE:
+        return None
+    try:
+        after = decode_cursor(columns, request.args['after']) if 'after' in request.args else None
+    except ValueError:
+        return None
+    now = datetime.utcnow()
+    query = query.filter(columns[0] >= now, columns[0] < now + timedelta(days=within))
+    return KeysetQuery(query, columns, cursor, url_id, key, after, limit, {'within': within}, serialize).execute()
@@ -0,0 +1,106 @@
+import math
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic, time
+
+from flask import abort, current_app, request
+
+from .server import ACCEPTED_AT_KEY
+
+class TokenBucket:
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, cost, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0
+        return (cost - self.tokens) / self.rate
+
+class RateLimiter:
+    def __init__(self, rate, capacity, max_clients=10000, clock=monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_clients = max_clients
+        self.clock = clock
+        self.buckets = OrderedDict()
+        self.lock = Lock()
+
+    def take(self, key, cost=1):
+        now = self.clock()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.rate, self.capacity, now)
+                while len(self.buckets) > self.max_clients:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+            return bucket.take(min(cost, self.capacity), now)
+
+def address_key():
+    return 'ip:' + (request.remote_addr or 'unknown')
+
+def user_key(user):
+    return f'user:{user.id}'
+
+def request_start():
+    accepted_at = request.environ.get(ACCEPTED_AT_KEY)
+    if accepted_at is not None:
+        return accepted_at
+    value = request.headers.get('X-Request-Start', '')
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        start = float(value)
+    except ValueError:
+        return None
+    if start > 1e14:
+        return start / 1e6
+    if start > 1e11:
+        return start / 1e3
+    return start
+
+def retry_after(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+def get_rate_limiter():
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is None:
+        limiter = current_app.extensions['rate_limiter'] = RateLimiter(current_app.config['RATE_LIMIT_RATE'],
+                                                                       current_app.config['RATE_LIMIT_BURST'],
+                                                                       current_app.config['RATE_LIMIT_MAX_CLIENTS'])
+    return limiter
+
+def limit_rate(key):
+    if not current_app.config['RATE_LIMIT_ENABLED'] or request.endpoint is None:
+        return
+    cost = current_app.config['RATE_LIMIT_COSTS'].get(request.endpoint, 1)
+    wait = get_rate_limiter().take(key, cost)
+    if wait:
+        current_app.extensions['rate_limited_requests'].inc(endpoint=request.endpoint)
+        abort(current_app.response_class('', 429, {'Retry-After': retry_after(wait)}))
+
+def init_rate_limiting(app):
+    registry = app.extensions['metrics']
+    app.extensions['rate_limited_requests'] = registry.counter('rate_limited_requests_total',
+                                                               'Requests rejected by the rate limiter', ['endpoint'])
+    shed = registry.counter('shed_requests_total', 'Requests shed because they queued for too long', ['endpoint'])
+    queue_time = registry.histogram('http_request_queue_seconds', 'Time requests waited before being handled')
+
+    @app.before_request
+    def shed_load():
+        start = request_start()
+        if start is None:
+            return
+        waited = max(0.0, time() - start)
+        queue_time.observe(waited)
+        threshold = current_app.config['LOAD_SHED_QUEUE_MS']
+        if threshold is not None and waited * 1000 > threshold:
+            shed.inc(endpoint=request.endpoint or 'unknown')
+            return '', 503, {'Retry-After': retry_after(max(current_app.config['LOAD_SHED_RETRY_AFTER'], waited))}
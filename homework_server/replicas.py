@@ -0,0 +1,142 @@
+import hashlib
+import itertools
+import time
+from threading import Lock
+
+from flask import current_app, request
+from flask_sqlalchemy import SignallingSession, get_state
+from sqlalchemy import event
+from sqlalchemy.sql.expression import SelectBase
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+class ReplicaSet:
+    def __init__(self, db, app):
+        self.db = db
+        self.app = app
+        self.binds = []
+        for i, uri in enumerate(app.config['SQLALCHEMY_REPLICA_URIS']):
+            bind = f'{REPLICA_BIND_PREFIX}{i}'
+            app.config['SQLALCHEMY_BINDS'] = dict(app.config['SQLALCHEMY_BINDS'] or {}, **{bind: uri})
+            self.binds.append(bind)
+        self.cycle = itertools.cycle(self.binds)
+        self.checked_at = {}
+        self.healthy = {bind: True for bind in self.binds}
+        self.pinned = {}
+        self.refused = False
+        self.lock = Lock()
+
+    def engine(self, bind):
+        return self.db.get_engine(self.app, bind=bind)
+
+    def check(self, bind):
+        try:
+            with self.engine(bind).connect() as connection:
+                connection.execute('SELECT 1')
+            healthy = True
+        except Exception:
+            healthy = False
+        self.healthy[bind] = healthy
+        self.checked_at[bind] = time.monotonic()
+        return healthy
+
+    def mark_unhealthy(self, bind):
+        self.healthy[bind] = False
+        self.checked_at[bind] = time.monotonic()
+
+    def is_healthy(self, bind):
+        interval = self.app.config['REPLICA_HEALTH_CHECK_INTERVAL']
+        if time.monotonic() - self.checked_at.get(bind, float('-inf')) >= interval:
+            return self.check(bind)
+        return self.healthy[bind]
+
+    def choose(self):
+        for _ in range(len(self.binds)):
+            with self.lock:
+                bind = next(self.cycle)
+            if self.is_healthy(bind):
+                return self.engine(bind)
+        return None
+
+    def routable(self):
+        workers = self.app.config['SERVER_WORKERS']
+        if workers > 1 and not self.refused:
+            self.refused = True
+            self.app.logger.warning('read-your-writes pins cannot be shared across %d worker processes, '
+                                    'reads are served by the primary', workers)
+        return workers <= 1
+
+    def pin(self, key):
+        now = time.monotonic()
+        with self.lock:
+            if len(self.pinned) > 10000:
+                self.pinned = {k: until for k, until in self.pinned.items() if until > now}
+            self.pinned[key] = now + self.app.config['REPLICA_PIN_SECONDS']
+
+    def is_pinned(self, key):
+        return self.pinned.get(key, float('-inf')) > time.monotonic()
+
+def get_replica_set(app):
+    replicas = app.extensions.get('replicas')
+    if replicas is None:
+        replicas = app.extensions['replicas'] = ReplicaSet(get_state(app).db, app)
+        for bind in replicas.binds:
+            watch_replica(replicas, bind)
+    return replicas
+
+def principal_key():
+    authorization = request.headers.get('Authorization')
+    if authorization is None:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+def watch_replica(replicas, bind):
+    @event.listens_for(replicas.engine(bind), 'handle_error')
+    def handle_error(context):
+        if context.is_disconnect or context.connection is None:
+            replicas.mark_unhealthy(bind)
+
+class RoutingSession(SignallingSession):
+    def get_bind(self, mapper=None, clause=None):
+        replica = self.info.get('replica')
+        if replica is not None and isinstance(clause, SelectBase) and not self._flushing:
+            return replica
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+    def execute(self, clause, *args, **kwargs):
+        if not isinstance(clause, SelectBase):
+            self.info.pop('replica', None)
+        return super(RoutingSession, self).execute(clause, *args, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def pin_to_primary(session, flush_context):
+    session.info.pop('replica', None)
+
+def init_replicas(app, db):
+    if app.config['SQLALCHEMY_REPLICA_URIS']:
+        get_replica_set(app)
+
+    @app.before_request
+    def route_to_replica():
+        if not current_app.config['SQLALCHEMY_REPLICA_URIS'] or request.method not in ['GET', 'HEAD']:
+            return
+        replicas = get_replica_set(current_app)
+        if not replicas.routable() or replicas.is_pinned(principal_key()):
+            return
+        replica = replicas.choose()
+        if replica is not None:
+            db.session.info['replica'] = replica
+
+    @app.after_request
+    def pin_writer(response):
+        if not current_app.config['SQLALCHEMY_REPLICA_URIS']:
+            return response
+        key = principal_key()
+        if key is not None and request.method not in ['GET', 'HEAD', 'OPTIONS'] and response.status_code < 400:
+            get_replica_set(current_app).pin(key)
+        return response
+
+    @app.teardown_request
+    def reset_routing(exc):
+        if current_app.config['SQLALCHEMY_REPLICA_URIS']:
+            db.session.info.pop('replica', None)
@@ -0,0 +1,42 @@
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+
+from . import db
+from .models import Course, Homework, students_courses_table, students_homeworks_table
+
+def add_missing_columns(engine, inspector):
+    added = []
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                engine.execute(f'ALTER TABLE {table.name} ADD COLUMN {ddl}')
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+def refresh_counters(engine=None):
+    engine = engine or db.get_engine()
+    for model, table, key, counter in [(Course, students_courses_table, 'course_id', 'student_count'),
+                                       (Homework, students_homeworks_table, 'homework_id', 'assigned_count')]:
+        count = db.select([db.func.count()]).where(table.c[key]==model.__table__.c.id).as_scalar()
+        engine.execute(model.__table__.update().values({counter: count}))
+
+def upgrade_schema(engine=None):
+    engine = engine or db.get_engine()
+    existing_tables = set(inspect(engine).get_table_names())
+    db.metadata.create_all(engine)
+
+    inspector = inspect(engine)
+    created = [table.name for table in db.metadata.sorted_tables if table.name not in existing_tables]
+    created += add_missing_columns(engine, inspector)
+    if set(created) & {'courses.student_count', 'homeworks.assigned_count'}:
+        refresh_counters(engine)
+
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(engine)
+                created.append(index.name)
+    return created
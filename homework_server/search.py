@@ -0,0 +1,108 @@
+import re
+
+from sqlalchemy import event, literal, literal_column
+from sqlalchemy.sql import column, table
+
+from . import db
+from .models import Administrator, Course, Homework, Teacher, students_courses_table
+
+SEARCH_INDEX = 'search_index'
+
+search_index = table(SEARCH_INDEX, column('rowid'))
+
+SEARCH_INDEX_DDL = [
+    f"CREATE VIRTUAL TABLE {SEARCH_INDEX} USING fts5(name, description, tokenize='unicode61 remove_diacritics 2', "
+    "prefix='2 3')"
+]
+for source, offset in [('courses', 0), ('homeworks', 1)]:
+    rowid = f'{{}}.id * 2 + {offset}'
+    SEARCH_INDEX_DDL += [
+        f'CREATE TRIGGER IF NOT EXISTS {source}_search_insert AFTER INSERT ON {source} BEGIN '
+        f'INSERT INTO {SEARCH_INDEX}(rowid, name, description) '
+        f'VALUES ({rowid.format("new")}, new.name, new.description); END',
+        f'CREATE TRIGGER IF NOT EXISTS {source}_search_update AFTER UPDATE OF name, description ON {source} BEGIN '
+        f'UPDATE {SEARCH_INDEX} SET name = new.name, description = new.description '
+        f'WHERE rowid = {rowid.format("old")}; END',
+        f'CREATE TRIGGER IF NOT EXISTS {source}_search_delete AFTER DELETE ON {source} BEGIN '
+        f'DELETE FROM {SEARCH_INDEX} WHERE rowid = {rowid.format("old")}; END',
+        f'INSERT INTO {SEARCH_INDEX}(rowid, name, description) '
+        f'SELECT {rowid.format(source)}, name, description FROM {source}'
+    ]
+
+def uses_full_text(bind):
+    return bind.dialect.name == 'sqlite'
+
+@event.listens_for(db.metadata, 'after_create')
+def create_search_index(target, connection, **kw):
+    if not uses_full_text(connection) or connection.dialect.has_table(connection, SEARCH_INDEX):
+        return
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(statement)
+
+@event.listens_for(db.metadata, 'after_drop')
+def drop_search_index(target, connection, **kw):
+    if uses_full_text(connection):
+        connection.execute(f'DROP TABLE IF EXISTS {SEARCH_INDEX}')
+
+def search_terms(text):
+    return re.findall(r'\w+', text or '')
+
+def full_text_matches(terms):
+    expression = ' '.join('"{}"*'.format(term.replace('"', '')) for term in terms)
+    rank = db.func.bm25(literal_column(SEARCH_INDEX), 10.0, 1.0)
+    return db.select([search_index.c.rowid.label('rowid'), rank.label('rank')]) \
+             .where(literal_column(SEARCH_INDEX).match(expression)) \
+             .alias('matches')
+
+def like_rank(model, terms):
+    conditions = [db.or_(model.name.ilike(f'%{term}%'), model.description.ilike(f'%{term}%')) for term in terms]
+    in_name = db.and_(*[model.name.ilike(f'%{term}%') for term in terms])
+    return db.and_(*conditions), db.case([(in_name, 0)], else_=1)
+
+def scope_homeworks(query, user):
+    if isinstance(user, Administrator):
+        return query
+    if isinstance(user, Teacher):
+        return query.filter(Course.teacher_id==user.id)
+    enrolled = db.select([students_courses_table.c.course_id]).where(students_courses_table.c.student_id==user.id)
+    return query.filter(Homework.course_id.in_(enrolled))
+
+def search_query(text, user):
+    terms = search_terms(text)
+    if uses_full_text(db.session.get_bind(Course.__mapper__)):
+        matches = full_text_matches(terms)
+        courses = db.session.query(Course.id, Course.name, Course.description, matches.c.rank) \
+                            .select_from(matches) \
+                            .join(Course, Course.id==matches.c.rowid / 2) \
+                            .filter(matches.c.rowid % 2 == 0)
+        homeworks = db.session.query(Homework.id, Homework.name, Homework.description, matches.c.rank) \
+                              .select_from(matches) \
+                              .join(Homework, Homework.id==matches.c.rowid / 2) \
+                              .filter(matches.c.rowid % 2 == 1)
+    else:
+        condition, rank = like_rank(Course, terms)
+        courses = db.session.query(Course.id, Course.name, Course.description, rank).filter(condition)
+        condition, rank = like_rank(Homework, terms)
+        homeworks = db.session.query(Homework.id, Homework.name, Homework.description, rank).filter(condition)
+
+    courses = courses.filter(Course.deleted_at.is_(None)) \
+                     .add_columns(literal('course').label('type'), literal(None).label('course_id'),
+                                  literal(None).label('course'))
+    homeworks = scope_homeworks(homeworks.join(Course, Course.id==Homework.course_id), user) \
+                         .filter(Homework.deleted_at.is_(None), Course.deleted_at.is_(None)) \
+                         .add_columns(literal('homework').label('type'), Course.id, Course.name)
+    results = courses.union_all(homeworks).subquery()
+    columns = ['id', 'name', 'description', 'rank', 'type', 'course_id', 'course']
+    results = db.Query([column.label(name) for column, name in zip(results.c, columns)], db.session())
+    return results.order_by(literal_column('rank'), literal_column('name'), literal_column('id'))
+
+def search_result(row):
+    result = {
+        'type': row.type,
+        'id': row.id,
+        'name': row.name,
+        'description': row.description
+    }
+    if row.type == 'homework':
+        result.update({'course_id': row.course_id, 'course': row.course})
+    return result
\ No newline at end of file
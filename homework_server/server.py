@@ -0,0 +1,184 @@
+import os
+import signal
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, local
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from . import db
+
+ACCEPTED_AT_KEY = 'homework_server.accepted_at'
+
+class PoolRequestHandler(WSGIRequestHandler):
+    def make_environ(self):
+        environ = super(PoolRequestHandler, self).make_environ()
+        environ[ACCEPTED_AT_KEY] = self.server.current.accepted_at
+        return environ
+
+class PoolWSGIServer(BaseWSGIServer):
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, port, app, threads, fd=None):
+        super(PoolWSGIServer, self).__init__(host, port, app, PoolRequestHandler, fd=fd)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='homework-server-worker')
+        self.current = local()
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address, time.time())
+
+    def process_request_thread(self, request, client_address, accepted_at):
+        self.current.accepted_at = accepted_at
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def stop(self):
+        Thread(target=self.shutdown, daemon=True).start()
+
+def dispose_engines(app):
+    with app.app_context():
+        for engine in db.get_engines().values():
+            engine.dispose()
+
+class PreforkServer:
+    def __init__(self, app_factory, host='127.0.0.1', port=5000, workers=None, threads=8,
+                 graceful_timeout=30, backlog=128):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.worker_count = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.socket = None
+        self.workers = {}
+        self.generation = 0
+        self.reload_requested = False
+        self.stop_requested = False
+
+    def log(self, message):
+        sys.stderr.write(f'[{os.getpid()}] {message}\n')
+        sys.stderr.flush()
+
+    def bind(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(self.backlog)
+        self.port = self.socket.getsockname()[1]
+
+    def start(self):
+        if self.socket is None:
+            self.bind()
+        for i in range(self.worker_count):
+            self.spawn()
+        self.log(f'listening on http://{self.host}:{self.port} with {self.worker_count} workers '
+                 f'x {self.threads} threads')
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = self.generation
+            return pid
+        code = 0
+        try:
+            self.run_worker()
+        except BaseException:
+            code = 1
+            sys.excepthook(*sys.exc_info())
+        finally:
+            os._exit(code)
+
+    def run_worker(self):
+        for signum in [signal.SIGHUP, signal.SIGINT]:
+            signal.signal(signum, signal.SIG_IGN)
+        app = self.app_factory()
+        app.config['SERVER_WORKERS'] = self.worker_count
+        dispose_engines(app)
+        server = PoolWSGIServer(self.host, self.port, app, self.threads, fd=self.socket.fileno())
+        self.socket.close()
+        signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+        server.serve_forever()
+        server.executor.shutdown(wait=True)
+        dispose_engines(app)
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if not pid:
+                return
+            generation = self.workers.pop(pid, None)
+            if generation == self.generation and not self.stop_requested:
+                self.log(f'worker {pid} exited with status {status}, restarting it')
+
+    def current_workers(self):
+        return [pid for pid, generation in self.workers.items() if generation == self.generation]
+
+    def reload(self):
+        old_workers = list(self.workers)
+        self.generation += 1
+        self.log(f'reloading {len(old_workers)} workers')
+        for i in range(self.worker_count):
+            self.spawn()
+        self.terminate(old_workers)
+
+    def terminate(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def kill(self, pid):
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        del self.workers[pid]
+
+    def stop(self):
+        self.stop_requested = True
+        self.terminate(list(self.workers))
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.workers):
+            self.log(f'worker {pid} did not stop in time, killing it')
+            self.kill(pid)
+        self.socket.close()
+
+    def serve_forever(self):
+        def request_reload(signum, frame):
+            self.reload_requested = True
+
+        def request_stop(signum, frame):
+            self.stop_requested = True
+
+        signal.signal(signal.SIGHUP, request_reload)
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        self.start()
+        while not self.stop_requested:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            self.reap()
+            for i in range(self.worker_count - len(self.current_workers())):
+                self.spawn()
+            time.sleep(0.1)
+        self.log('shutting down')
+        self.stop()
\ No newline at end of file
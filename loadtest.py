@@ -0,0 +1,55 @@
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    import os
+    from functools import partial
+
+    from homework_server import create_app
+    from homework_server.loadtest import MIXES, format_report, format_scaling, run_load, run_scaling
+
+    def parse_weights(value):
+        weights = {}
+        for item in value.split(','):
+            name, weight = item.split('=')
+            if name not in ['login', 'poll', 'submit']:
+                raise argparse.ArgumentTypeError(f'unknown scenario {name}')
+            weights[name] = float(weight)
+        return weights
+
+    parser = argparse.ArgumentParser(description='Replay a weighted scenario mix against a running server.')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='polling')
+    parser.add_argument('--weights', type=parse_weights, help='custom mix, e.g. login=1,poll=5,submit=2')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--iterations', type=int, help='scenarios per worker instead of a duration')
+    parser.add_argument('--users', type=int, default=100, help='number of dataset students to log in as')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--serve-workers', type=lambda value: [int(count) for count in value.split(',')],
+                        help='start a local prefork server with each of these worker counts, e.g. 1,2,4, '
+                             'and compare their throughput instead of using --url')
+    parser.add_argument('--serve-threads', type=int, default=8, help='threads per server worker')
+    args = parser.parse_args()
+
+    load_options = {
+        'workers': args.workers,
+        'duration': None if args.iterations else args.duration,
+        'iterations': args.iterations,
+        'users': args.users,
+        'seed': args.seed
+    }
+    if args.serve_workers:
+        results = run_scaling(partial(create_app, os.environ.get('CONFIG', 'development'), RATE_LIMIT_ENABLED=False),
+                              args.serve_workers, args.weights or args.mix,
+                              threads=args.serve_threads, **load_options)
+        print(format_scaling(results))
+    else:
+        results = run_load(args.url, args.weights or args.mix, **load_options)
+        print(format_report(results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
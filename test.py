@@ -1,4 +1,38 @@
+import argparse
+import os
+import subprocess
+import sys
 import unittest
+from time import perf_counter
 
-tests = unittest.TestLoader().discover('tests')
-unittest.TextTestRunner(verbosity=2).run(tests)
\ No newline at end of file
+def test_modules():
+    return sorted(f'tests.{name[:-3]}' for name in os.listdir('tests') if name.startswith('test') and name.endswith('.py'))
+
+def run_shards(count):
+    modules = test_modules()
+    shards = [modules[i::count] for i in range(count) if modules[i::count]]
+    start = perf_counter()
+    processes = [(shard, perf_counter(), subprocess.Popen([sys.executable, '-m', 'unittest', '-q'] + shard))
+                 for shard in shards]
+    failed = False
+    for i, (shard, shard_start, process) in enumerate(processes):
+        code = process.wait()
+        failed = failed or code != 0
+        print(f'shard {i}: {len(shard)} modules, exit code {code}, {perf_counter() - shard_start:.2f}s')
+    print(f'{len(shards)} shards finished in {perf_counter() - start:.2f}s')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the test suite.')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='split the test modules across this many processes, each with its own database')
+    args = parser.parse_args()
+
+    if args.shards > 1:
+        sys.exit(run_shards(args.shards))
+
+    start = perf_counter()
+    tests = unittest.TestLoader().discover('tests')
+    result = unittest.TextTestRunner(verbosity=2).run(tests)
+    print(f'finished in {perf_counter() - start:.2f}s')
+    sys.exit(0 if result.wasSuccessful() else 1)
\ No newline at end of file
@@ -1,24 +1,83 @@
 import base64
+from contextlib import contextmanager
 import itertools
+import sqlite3
 import unittest
 
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
 from homework_server import create_app, db
 from homework_server.models import Administrator, Student, Teacher
 
+SAVEPOINT_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+shared_connection = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None)
+schema_created = False
+password_hashes = {}
+
+def password_hash(password):
+    if password not in password_hashes:
+        password_hashes[password] = generate_password_hash(password, method='pbkdf2:sha256:1')
+    return password_hashes[password]
 
 class BaseTest(unittest.TestCase):
+    transactional = True
+
     def setUp(self):
-        self.app = create_app('testing')
+        if self.transactional:
+            self.app = create_app('testing', SQLALCHEMY_ENGINE_OPTIONS={
+                'creator': lambda: shared_connection,
+                'pool_reset_on_return': None
+            })
+        else:
+            self.app = create_app('testing')
+        self.configure(self.app.config)
         self.app_context = self.app.app_context()
         self.app_context.push()
-        db.drop_all()
-        db.create_all()
+        if self.transactional:
+            self.begin()
+        else:
+            db.drop_all()
+            db.create_all()
         self.client = self.app.test_client()
 
     def tearDown(self):
-        db.drop_all()
+        if self.transactional:
+            db.session.remove()
+            self.transaction.rollback()
+            self.connection.close()
+        else:
+            db.drop_all()
         self.app_context.pop()
 
+    def configure(self, config):
+        pass
+
+    def begin(self):
+        global schema_created
+        engine = db.get_engine()
+
+        @event.listens_for(engine, 'begin')
+        def begin(connection):
+            connection.execute('BEGIN')
+
+        if not schema_created:
+            db.create_all()
+            schema_created = True
+
+        self.connection = engine.connect()
+        self.transaction = self.connection.begin()
+        session = db.create_session({'bind': self.connection, 'binds': {}})()
+        db.session.registry.set(session)
+        session.begin_nested()
+
+        @event.listens_for(session, 'after_transaction_end')
+        def restart_savepoint(session, transaction):
+            if transaction.nested and not transaction._parent.nested:
+                session.expire_all()
+                session.begin_nested()
+
 class BaseApiTest(BaseTest):
     def setUp(self):
         super(BaseApiTest, self).setUp()
@@ -26,25 +85,25 @@ class BaseApiTest(BaseTest):
         self.admin = Administrator()
         self.admin.from_dict({
             'name': 'admin',
-            'username': 'admin',
-            'password': 'admin'
+            'username': 'admin'
         })
+        self.admin.password_hash = password_hash('admin')
         db.session.add(self.admin)
 
         self.teacher = Teacher()
         self.teacher.from_dict({
             'name': 'teacher',
-            'username': 'teacher',
-            'password': 'teacher'
+            'username': 'teacher'
         })
+        self.teacher.password_hash = password_hash('teacher')
         db.session.add(self.teacher)
 
         self.student = Student()
         self.student.from_dict({
             'name': 'student',
-            'username': 'student',
-            'password': 'student'
+            'username': 'student'
         })
+        self.student.password_hash = password_hash('student')
         db.session.add(self.student)
 
         db.session.commit()
@@ -81,4 +140,22 @@ class BaseApiTest(BaseTest):
                     d[f] = data[f]
                 request_datas.append(d)
 
-        return request_datas
\ No newline at end of file
+        return request_datas
+
+    @contextmanager
+    def query_budget(self, budget, raiseload=True):
+        statements = []
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            if not statement.startswith(SAVEPOINT_STATEMENTS):
+                statements.append(statement)
+
+        engine = db.get_engine()
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        self.app.config['SQLALCHEMY_RAISELOAD'] = raiseload
+        try:
+            yield statements
+        finally:
+            self.app.config['SQLALCHEMY_RAISELOAD'] = False
+            event.remove(engine, 'before_cursor_execute', count_statement)
+        if len(statements) > budget:
+            self.fail(f'{len(statements)} queries over a budget of {budget}:\n' + '\n'.join(statements))
\ No newline at end of file
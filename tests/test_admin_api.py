@@ -2,7 +2,10 @@ import json
 
 from tests import BaseApiTest
 
+from werkzeug.security import check_password_hash
+
 from homework_server import db
+from homework_server.bulk import get_password_pool, hash_passwords
 from homework_server.models import Teacher, Student
 
 class AdminApiTest(BaseApiTest):
@@ -155,6 +158,90 @@ class AdminApiTest(BaseApiTest):
             rv = self.client.post('/api/v1/admin/students', headers=self.token_auth_header(token), data=json.dumps(d))
             self.assertEquals(rv.status_code, 400)
 
+    def test_create_students_bulk(self):
+        self.app.config['BULK_IMPORT_CHUNK_SIZE'] = 2
+
+        rows = [{'name': f'n{i}', 'username': f'u{i}', 'password': f'p{i}'} for i in range(5)]
+        rows += [
+            {'name': 'n', 'username': 'student', 'password': 'p'},
+            {'name': 'n', 'username': 'u0', 'password': 'p'},
+            {'name': 'n', 'username': 'u'},
+            'u'
+        ]
+
+        # try to access with basic authentication
+        rv = self.client.post('/api/v1/admin/students/bulk', headers=self.basic_auth_header('admin', 'admin'), \
+                              data=json.dumps(rows))
+        self.assertEquals(rv.status_code, 401)
+
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('admin', 'admin'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # access with token
+        rv = self.client.post('/api/v1/admin/students/bulk', headers=self.token_auth_header(token), \
+                              data=json.dumps({'students': rows}))
+        self.assertEquals(rv.status_code, 200)
+
+        # check the report
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['created'], 5)
+        self.assertEquals(data['failed'], 4)
+        self.assertEquals([result['row'] for result in data['results']], list(range(1, 10)))
+        self.assertTrue(all(result['status'] == 'created' for result in data['results'][:5]))
+        self.assertEquals([result['error'] for result in data['results'][5:]], \
+            ['username already exists', 'duplicate username in request', 'missing password', 'expected an object'])
+
+        # check if students were created
+        for i, result in enumerate(data['results'][:5]):
+            student = Student.query.filter_by(username=f'u{i}').first()
+            self.assertIsNotNone(student)
+            self.assertEquals(student.id, result['id'])
+            self.assertEquals(student.name, f'n{i}')
+            self.assertTrue(student.check_password(f'p{i}'))
+
+        # try to import without a list of rows
+        rv = self.client.post('/api/v1/admin/students/bulk', headers=self.token_auth_header(token), \
+                              data=json.dumps({'name': 'n'}))
+        self.assertEquals(rv.status_code, 400)
+
+    def test_create_teachers_bulk(self):
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('admin', 'admin'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # import from csv
+        headers = self.token_auth_header(token)
+        headers['Content-type'] = 'text/csv'
+        rv = self.client.post('/api/v1/admin/teachers/bulk', headers=headers, \
+                              data='name,username,password\nn1,u1,p1\nn2,teacher,p2\n')
+        self.assertEquals(rv.status_code, 200)
+
+        # check the report
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['created'], 1)
+        self.assertEquals(data['failed'], 1)
+        self.assertEquals(data['results'][1]['error'], 'username already exists')
+
+        # check if teacher was created
+        teacher = Teacher.query.filter_by(username='u1').first()
+        self.assertIsNotNone(teacher)
+        self.assertEquals(teacher.type, 'teachers')
+        self.assertTrue(teacher.check_password('p1'))
+
+    def test_hash_passwords(self):
+        passwords = ['p0', 'p1', 'p2', 'p3']
+        for workers in [1, 2]:
+            password_hashes = hash_passwords(passwords, workers)
+            self.assertEquals(len(password_hashes), len(passwords))
+            for password, password_hash in zip(passwords, password_hashes):
+                self.assertTrue(check_password_hash(password_hash, password))
+
+        # the process pool outlives the call
+        self.assertIs(get_password_pool(2), get_password_pool(2))
+
     def test_remove_student(self):
         # create a student
         student = Student()
@@ -0,0 +1,106 @@
+import json
+import shutil
+import tempfile
+
+from tests import BaseApiTest
+
+from werkzeug.contrib.cache import FileSystemCache, NullCache
+
+from homework_server import db
+from homework_server.cache import LRUCache, get_response_cache
+from homework_server.models import Course
+
+class ResponseCacheTest(BaseApiTest):
+    def get_token(self, username):
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header(username, username))
+        self.assertEquals(rv.status_code, 200)
+        return json.loads(rv.data.decode())['token']
+
+    def get_catalog(self, token, role='student'):
+        path = '/api/v1/student/courses/all' if role == 'student' else '/api/v1/teacher/courses'
+        rv = self.client.get(path, headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        return rv.headers['X-Cache'], json.loads(rv.data.decode())['courses']
+
+    def test_lru_eviction(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEquals(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEquals(cache.get('a'), 1)
+        self.assertEquals(cache.inc('counter'), 1)
+        self.assertEquals(cache.inc('counter'), 2)
+        self.assertEquals(len(cache), 2)
+
+    def test_local_cache_with_workers(self):
+        # the per-process cache is disabled once several workers serve the app
+        self.app.config['SERVER_WORKERS'] = 2
+        self.app.extensions.pop('response_cache', None)
+        with self.assertLogs(self.app.logger, 'WARNING'):
+            self.assertIsInstance(get_response_cache().backend, NullCache)
+
+        # shared backends are kept
+        del self.app.extensions['response_cache']
+        cache_dir = tempfile.mkdtemp()
+        self.app.config.update(RESPONSE_CACHE='filesystem', RESPONSE_CACHE_DIR=cache_dir)
+        try:
+            self.assertIsInstance(get_response_cache().backend, FileSystemCache)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_catalog_cache(self):
+        student_token = self.get_token('student')
+        teacher_token = self.get_token('teacher')
+
+        # the second request is served from the cache, per role
+        self.assertEquals(self.get_catalog(student_token), ('MISS', []))
+        self.assertEquals(self.get_catalog(student_token), ('HIT', []))
+        self.assertEquals(self.get_catalog(teacher_token, 'teacher'), ('MISS', []))
+        self.assertEquals(self.get_catalog(teacher_token, 'teacher'), ('HIT', []))
+
+        # logging in does not invalidate the catalog
+        self.get_token('student')
+        self.assertEquals(self.get_catalog(student_token)[0], 'HIT')
+
+        # a new course invalidates it
+        rv = self.client.post('/api/v1/teacher/courses', data=json.dumps({'name': 'course', 'description': 'course'}),
+                              headers=self.token_auth_header(teacher_token))
+        self.assertEquals(rv.status_code, 200)
+        result, courses = self.get_catalog(student_token)
+        self.assertEquals(result, 'MISS')
+        self.assertEquals([(course['name'], course['teacher'], course['student_count']) for course in courses],
+                          [('course', 'teacher', 0)])
+        self.assertEquals(self.get_catalog(teacher_token, 'teacher')[0], 'MISS')
+
+        # counter updates through core statements invalidate it
+        course_id = courses[0]['id']
+        rv = self.client.post(f'/api/v1/student/course/{course_id}', headers=self.token_auth_header(student_token))
+        self.assertEquals(rv.status_code, 200)
+        result, courses = self.get_catalog(student_token)
+        self.assertEquals((result, courses[0]['student_count']), ('MISS', 1))
+
+        # so does renaming the teacher
+        self.teacher.name = 'renamed'
+        db.session.commit()
+        result, courses = self.get_catalog(student_token)
+        self.assertEquals((result, courses[0]['teacher']), ('MISS', 'renamed'))
+
+        # and a direct core update that is rolled back does not
+        db.session.execute(Course.__table__.update().values(description='changed'))
+        db.session.rollback()
+        self.assertEquals(self.get_catalog(student_token)[0], 'HIT')
+
+    def test_hit_ratio_metric(self):
+        student_token = self.get_token('student')
+        for i in range(4):
+            self.get_catalog(student_token)
+
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('admin', 'admin'))
+        token = json.loads(rv.data.decode())['token']
+        rv = self.client.get('/api/v1/admin/metrics', headers=self.token_auth_header(token))
+        text = rv.data.decode()
+        self.assertIn('response_cache_requests_total{result="hit"} 3', text)
+        self.assertIn('response_cache_requests_total{result="miss"} 1', text)
+        self.assertIn('response_cache_hit_ratio 0.75', text)
\ No newline at end of file
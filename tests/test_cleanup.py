@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import tempfile
+
+from tests import BaseApiTest
+
+from homework_server import db
+from homework_server.jobs import get_job_queue
+from homework_server.models import Course, Homework, Solution, students_courses_table, students_homeworks_table
+
+class CleanupTest(BaseApiTest):
+    def configure(self, config):
+        self.upload_folder = tempfile.mkdtemp()
+        config['UPLOAD_FOLDER'] = self.upload_folder
+        config['JOBS_MODE'] = 'manual'
+        config['PURGE_CHUNK_SIZE'] = 2
+
+    def tearDown(self):
+        super(CleanupTest, self).tearDown()
+        shutil.rmtree(self.upload_folder)
+
+    def create_course(self):
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        course.students.append(self.student)
+        db.session.add(course)
+        db.session.commit()
+
+        file_paths = []
+        for i in range(3):
+            homework = Homework()
+            homework.from_dict({
+                'name': f'homework{i}',
+                'description': 'homework',
+                'deadline': '2018-11-08 08:48:11',
+                'headcount': 4,
+                'self_assignable': False
+            })
+            homework.course_id = course.id
+            homework.students.append(self.student)
+            db.session.add(homework)
+            db.session.commit()
+
+            for j in range(3):
+                file_path = os.path.join(self.upload_folder, 'course', homework.name, f'solution{j}.txt')
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, 'w') as f:
+                    f.write('solution')
+                solution = Solution()
+                solution.homework_id = homework.id
+                solution.file_path = file_path
+                db.session.add(solution)
+                file_paths.append(file_path)
+        db.session.commit()
+        return course.id, file_paths
+
+    def count(self, table):
+        return db.session.query(db.func.count()).select_from(table).scalar()
+
+    def test_remove_course(self):
+        course_id, file_paths = self.create_course()
+
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('teacher', 'teacher'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # remove the course
+        rv = self.client.delete(f'/api/v1/teacher/course/{course_id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+
+        # the course is hidden at once but its rows are still there
+        rv = self.client.get('/api/v1/teacher/courses', headers=self.token_auth_header(token))
+        self.assertEquals(json.loads(rv.data.decode())['courses'], [])
+        rv = self.client.get(f'/api/v1/teacher/course/{course_id}/homeworks', headers=self.token_auth_header(token))
+        self.assertEquals(json.loads(rv.data.decode())['homeworks'], [])
+        rv = self.client.delete(f'/api/v1/teacher/course/{course_id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 410)
+        self.assertEquals(self.count(Homework.__table__), 3)
+        self.assertEquals(self.count(Solution.__table__), 9)
+
+        # the purge job removes rows and files
+        get_job_queue().run_pending()
+        for table in [Course.__table__, Homework.__table__, Solution.__table__,
+                      students_courses_table, students_homeworks_table]:
+            self.assertEquals(self.count(table), 0)
+        for file_path in file_paths:
+            self.assertFalse(os.path.exists(file_path))
+        self.assertEquals(os.listdir(self.upload_folder), [])
+
+    def test_recreate_after_remove(self):
+        course_id, file_paths = self.create_course()
+
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('teacher', 'teacher'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # remove a homework and the course, the names are free before the purge runs
+        homework_id = Homework.query.filter_by(name='homework0').first().id
+        rv = self.client.delete(f'/api/v1/teacher/homework/{homework_id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        rv = self.client.delete(f'/api/v1/teacher/course/{course_id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+
+        # create a course and homeworks with the same names
+        rv = self.client.post('/api/v1/teacher/courses', headers=self.token_auth_header(token),
+                              data=json.dumps({'name': 'course', 'description': 'course'}))
+        self.assertEquals(rv.status_code, 200)
+        course = Course.query.filter_by(name='course').first()
+        for i in range(3):
+            rv = self.client.post(f'/api/v1/teacher/course/{course.id}/homeworks', headers=self.token_auth_header(token),
+                                  data=json.dumps({
+                                      'name': f'homework{i}',
+                                      'description': 'homework',
+                                      'deadline': '2018-11-08 08:48:11',
+                                      'headcount': 4,
+                                      'self_assignable': False
+                                  }))
+            self.assertEquals(rv.status_code, 200)
+
+        # the purge job leaves the new rows alone
+        get_job_queue().run_pending()
+        self.assertEquals(db.session.query(Course.name).all(), [('course',)])
+        self.assertEquals(sorted(db.session.query(Homework.name).all()), [('homework0',), ('homework1',), ('homework2',)])
@@ -0,0 +1,50 @@
+from sqlalchemy import inspect
+
+from tests import BaseTest
+
+from homework_server import create_app, db
+from homework_server.models import Administrator, Course, Homework, Student
+
+class CliTest(BaseTest):
+    transactional = False
+
+    def setUp(self):
+        super(CliTest, self).setUp()
+        self.runner = self.app.test_cli_runner()
+
+    def test_create_app_does_no_schema_work(self):
+        app = create_app('testing')
+        self.assertLess(app.extensions['startup_seconds'], 1)
+        with app.app_context():
+            self.assertEquals(inspect(db.get_engine()).get_table_names(), [])
+
+    def test_init_db(self):
+        db.drop_all()
+        result = self.runner.invoke(args=['init-db', '--admin-username', 'root', '--admin-password', 'root'])
+        self.assertEquals(result.exit_code, 0, result.output)
+        self.assertIn('created users', result.output)
+        self.assertIn('created administrator root', result.output)
+        self.assertTrue(Administrator.query.filter_by(username='root').first().check_password('root'))
+
+        # running again changes nothing
+        result = self.runner.invoke(args=['init-db', '--admin-username', 'root', '--admin-password', 'other'])
+        self.assertEquals(result.exit_code, 0, result.output)
+        self.assertIn('0 schema objects created', result.output)
+        self.assertTrue(Administrator.query.filter_by(username='root').first().check_password('root'))
+
+    def test_seed(self):
+        result = self.runner.invoke(args=['seed'])
+        self.assertEquals(result.exit_code, 0, result.output)
+        self.assertIn('created homework h', result.output)
+        self.assertEquals(Course.query.filter_by(name='c').first().student_count, 1)
+
+        # seeding is idempotent
+        result = self.runner.invoke(args=['seed'])
+        self.assertEquals(result.exit_code, 0, result.output)
+        self.assertNotIn('created', result.output)
+        self.assertEquals(Homework.query.count(), 1)
+
+        # a synthetic dataset can be added in bulk
+        result = self.runner.invoke(args=['seed', '--scale', 'tiny'])
+        self.assertEquals(result.exit_code, 0, result.output)
+        self.assertEquals(Student.query.count(), 51)
@@ -0,0 +1,120 @@
+import json
+import time
+from threading import Thread
+
+from tests import BaseApiTest
+
+from homework_server import db
+from homework_server.coalescing import SingleFlight
+from homework_server.models import Course, Homework
+
+class CoalescingTest(BaseApiTest):
+    def wait_for_waiters(self, single_flight, key, count):
+        deadline = time.monotonic() + 5
+        while single_flight.waiters(key) < count:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def run_followers(self, single_flight, key, func, count, timeout=5):
+        results = []
+        threads = [Thread(target=lambda: results.append(single_flight.do(key, func, timeout))) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_single_flight(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            self.wait_for_waiters(single_flight, 'key', 3)
+            return 'value'
+
+        # the leader waits until three followers joined it
+        leader = []
+        thread = Thread(target=lambda: leader.append(single_flight.do('key', compute)))
+        thread.start()
+        while not single_flight.calls:
+            time.sleep(0.01)
+        threads, results = self.run_followers(single_flight, 'key', lambda: 'other', 3)
+        for t in threads + [thread]:
+            t.join()
+
+        self.assertEquals(leader, [('value', 'leader')])
+        self.assertEquals(results, [('value', 'follower')] * 3)
+        self.assertEquals(len(calls), 1)
+        self.assertEquals(single_flight.calls, {})
+
+    def test_single_flight_fallback(self):
+        single_flight = SingleFlight()
+
+        def fail():
+            self.wait_for_waiters(single_flight, 'key', 2)
+            raise ValueError('failed')
+
+        # followers compute the result themselves when the leader fails
+        errors = []
+        def lead():
+            try:
+                single_flight.do('key', fail)
+            except ValueError as e:
+                errors.append(e)
+        thread = Thread(target=lead)
+        thread.start()
+        while not single_flight.calls:
+            time.sleep(0.01)
+        threads, results = self.run_followers(single_flight, 'key', lambda: 'own', 2)
+        for t in threads + [thread]:
+            t.join()
+        self.assertEquals(len(errors), 1)
+        self.assertEquals(results, [('own', 'fallback')] * 2)
+
+        # and when the leader takes longer than the timeout
+        def slow():
+            self.wait_for_waiters(single_flight, 'key', 1)
+            time.sleep(0.2)
+            return 'slow'
+        thread = Thread(target=lambda: single_flight.do('key', slow))
+        thread.start()
+        while not single_flight.calls:
+            time.sleep(0.01)
+        self.assertEquals(single_flight.do('key', lambda: 'own', 0.01), ('own', 'fallback'))
+        thread.join()
+
+    def test_coalesced_view(self):
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.commit()
+        homework = Homework()
+        homework.from_dict({
+            'name': 'homework',
+            'description': 'homework',
+            'deadline': '2018-11-08 08:48:11',
+            'headcount': 4,
+            'self_assignable': False
+        })
+        homework.course_id = course.id
+        db.session.add(homework)
+        db.session.commit()
+
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        token = json.loads(rv.data.decode())['token']
+        rv = self.client.get(f'/api/v1/student/course/{course.id}/homeworks', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        self.assertEquals(rv.headers['X-Coalesced'], 'leader')
+        self.assertEquals(rv.mimetype, 'application/json')
+        self.assertEquals([item['name'] for item in json.loads(rv.data.decode())['homeworks']], ['homework'])
+
+        # the coalescing ratio is exported
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('admin', 'admin'))
+        token = json.loads(rv.data.decode())['token']
+        rv = self.client.get('/api/v1/admin/metrics', headers=self.token_auth_header(token))
+        text = rv.data.decode()
+        self.assertIn('coalesced_requests_total{endpoint="student_api.get_homeworks_for_course",result="leader"} 1', text)
+        self.assertIn('request_coalescing_ratio{endpoint="student_api.get_homeworks_for_course"} 0.0', text)
\ No newline at end of file
@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+
+from tests import BaseTest
+
+from homework_server import db
+from homework_server.benchmark import ROUTES, run_benchmark
+from homework_server.dataset import generate_dataset
+from homework_server.models import Course, Homework, Student, students_courses_table
+
+class DatasetTest(BaseTest):
+    transactional = False
+
+    def configure(self, config):
+        self.upload_folder = tempfile.mkdtemp()
+        config['UPLOAD_FOLDER'] = self.upload_folder
+        config['JOBS_MODE'] = 'manual'
+
+    def tearDown(self):
+        super(DatasetTest, self).tearDown()
+        shutil.rmtree(self.upload_folder)
+
+    def enrollments(self):
+        return db.session.query(students_courses_table).order_by('student_id', 'course_id').all()
+
+    def test_generate_dataset(self):
+        counts = generate_dataset('tiny', seed=1)
+        self.assertEquals(counts['students'], 50)
+        self.assertEquals(counts['enrollments'], 100)
+        self.assertEquals(counts['assignments'], 200)
+        self.assertEquals(Student.query.count(), 50)
+        self.assertEquals(Homework.query.count(), 24)
+
+        # counters match the association tables
+        self.assertEquals(sum(course.student_count for course in Course.query), 100)
+        self.assertEquals(sum(homework.assigned_count for homework in Homework.query), 200)
+        self.assertTrue(all(homework.assigned_count <= homework.headcount for homework in Homework.query))
+
+        # ids come from the database, so regular inserts continue after the generated rows
+        course = Course()
+        course.from_dict({'name': 'regular', 'description': 'regular'})
+        db.session.add(course)
+        db.session.commit()
+        self.assertEquals(course.id, 7)
+
+        # the same seed gives the same dataset
+        enrollments = self.enrollments()
+        db.drop_all()
+        db.create_all()
+        generate_dataset('tiny', seed=1)
+        self.assertEquals(self.enrollments(), enrollments)
+
+    def test_routes_cover_every_endpoint(self):
+        endpoints = {rule.endpoint for rule in self.app.url_map.iter_rules() if rule.endpoint != 'static'}
+        self.assertEquals({endpoint for endpoint, _ in ROUTES}, endpoints)
+
+    def test_benchmark(self):
+        generate_dataset('tiny')
+        results = run_benchmark(self.app, 5)
+        self.assertEquals(set(results), {endpoint for endpoint, _ in ROUTES})
+        for endpoint, result in results.items():
+            self.assertEquals(result['errors'], 0, endpoint)
+            self.assertGreater(result['queries'], 0, endpoint)
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import tempfile
+
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from tests import BaseApiTest, BaseTest
+
+from homework_server import create_app, db
+from homework_server.metrics import get_metrics
+
+class EngineTest(BaseTest):
+    transactional = False
+
+    def setUp(self):
+        super(EngineTest, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(EngineTest, self).tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_sqlite_file_profile(self):
+        app = create_app('testing')
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.tmp_dir, 'db.sqlite')
+        with app.app_context():
+            engine = db.get_engine()
+            self.assertIsInstance(engine.pool, QueuePool)
+            self.assertEquals(engine.pool.size(), 5)
+
+            # check pragmas on a fresh connection
+            with engine.connect() as connection:
+                self.assertEquals(connection.execute('PRAGMA journal_mode').scalar(), 'wal')
+                self.assertEquals(connection.execute('PRAGMA synchronous').scalar(), 1)
+                self.assertEquals(connection.execute('PRAGMA busy_timeout').scalar(), 5000)
+
+                # check pool statistics while a connection is checked out
+                stats = db.pool_statistics()['default']
+                self.assertEquals(stats['pool'], 'QueuePool')
+                self.assertEquals(stats['checked_out'], 1)
+                self.assertIn('db_pool_checked_out{bind="default"} 1', get_metrics().render())
+            engine.dispose()
+
+    def test_sqlite_memory_profile(self):
+        engine = db.get_engine()
+        self.assertIsInstance(engine.pool, StaticPool)
+        stats = db.pool_statistics()['default']
+        self.assertEquals(stats['pool'], 'StaticPool')
+
+class PoolStatisticsApiTest(BaseApiTest):
+    def test_get_pool_statistics(self):
+        # try to access with basic authentication
+        rv = self.client.get('/api/v1/admin/database/pool', headers=self.basic_auth_header('admin', 'admin'))
+        self.assertEquals(rv.status_code, 401)
+
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('admin', 'admin'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # access with token
+        rv = self.client.get('/api/v1/admin/database/pool', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+
+        # check returned data
+        data = json.loads(rv.data.decode())
+        self.assertTrue('default' in data)
+        self.assertTrue(all(item in data['default'] for item in ['pool', 'status']))
@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from tests import BaseApiTest
+
+from homework_server import db
+from homework_server.instrumentation import SlowQueryLog, get_slow_query_log
+from homework_server.models import Course
+
+class InstrumentationTest(BaseApiTest):
+    transactional = False
+
+    def configure(self, config):
+        config['SQL_INSTRUMENTATION'] = True
+        config['RESPONSE_CACHE'] = 'none'
+
+    def get_courses(self, token):
+        rv = self.client.get('/api/v1/student/courses/all', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        match = re.match(r'db;dur=([\d.]+);desc="(\d+) queries", app;dur=([\d.]+)$', rv.headers['Server-Timing'])
+        self.assertIsNotNone(match)
+        return int(match.group(2))
+
+    def test_server_timing(self):
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # every course adds a query for its teacher
+        queries = self.get_courses(token)
+        for i in range(3):
+            course = Course()
+            course.from_dict({
+                'name': f'course{i}',
+                'description': 'course'
+            })
+            course.teacher_id = self.teacher.id
+            db.session.add(course)
+        db.session.commit()
+        self.assertEquals(self.get_courses(token), queries + 3)
+
+        # the request is logged with its statistics
+        with self.assertLogs(self.app.logger, 'INFO') as logs:
+            self.get_courses(token)
+        record = logs.records[0]
+        self.assertEquals(record.path, '/api/v1/student/courses/all')
+        self.assertEquals(record.sql_queries, queries + 3)
+
+    def test_disabled(self):
+        self.app.config['SQL_INSTRUMENTATION'] = False
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        self.assertEquals(rv.status_code, 200)
+        self.assertNotIn('Server-Timing', rv.headers)
+
+class SlowQueryTest(BaseApiTest):
+    transactional = False
+
+    def configure(self, config):
+        self.tmp_dir = tempfile.mkdtemp()
+        config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.tmp_dir, 'db.sqlite')
+        config['SLOW_QUERY_THRESHOLD_MS'] = 0
+
+    def tearDown(self):
+        super(SlowQueryTest, self).tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_slow_query_log(self):
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # every statement is over the threshold
+        with self.assertLogs(self.app.logger, 'WARNING') as logs:
+            rv = self.client.get('/api/v1/student/courses/all', headers=self.token_auth_header(token))
+            self.assertEquals(rv.status_code, 200)
+        slow = [record for record in logs.records if hasattr(record, 'duration_ms')]
+        self.assertTrue(slow)
+        self.assertTrue(all(record.endpoint == 'student_api.get_courses' for record in slow))
+        select = next(record for record in slow if 'FROM courses' in record.sql and 'LIMIT' in record.sql)
+        self.assertEquals(select.parameters, ['int', 'int'])
+
+        # the plan is captured once per statement
+        plans = get_slow_query_log().plans
+        self.assertIn('SCAN', plans.get(select.sql))
+        with self.assertLogs(self.app.logger, 'WARNING') as logs:
+            self.client.get('/api/v1/student/courses/all', headers=self.token_auth_header(token))
+        self.assertFalse([record for record in logs.records if hasattr(record, 'plan')])
+
+    def test_plan_outside_request(self):
+        # capturing plans inline keeps the caller's uncommitted work
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        self.assertEquals(rv.status_code, 200)
+        course = Course()
+        course.from_dict({'name': 'pending', 'description': 'pending'})
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.flush()
+        with self.assertLogs(self.app.logger, 'WARNING') as logs:
+            self.assertEquals(Course.query.filter_by(name='pending').count(), 1)
+        self.assertTrue([record for record in logs.records if hasattr(record, 'plan')])
+        db.session.commit()
+        self.assertIsNotNone(Course.query.filter_by(name='pending').first())
+
+    def test_bounded_log(self):
+        log = SlowQueryLog(max_statements=2)
+        self.assertEquals([log.first_seen(statement) for statement in ['a', 'b', 'a', 'c', 'b']],
+                          [True, True, False, True, True])
+        self.assertEquals(len(log.seen), 2)
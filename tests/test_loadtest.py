@@ -0,0 +1,47 @@
+import shutil
+import tempfile
+from threading import Thread
+
+from werkzeug.serving import make_server
+
+from tests import BaseTest
+
+from homework_server.dataset import generate_dataset
+from homework_server.loadtest import run_load
+from homework_server.models import Solution
+
+class LoadTest(BaseTest):
+    transactional = False
+
+    def configure(self, config):
+        self.upload_folder = tempfile.mkdtemp()
+        config['UPLOAD_FOLDER'] = self.upload_folder
+
+    def setUp(self):
+        super(LoadTest, self).setUp()
+        generate_dataset('tiny')
+        self.server = make_server('127.0.0.1', 0, self.app)
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        super(LoadTest, self).tearDown()
+        shutil.rmtree(self.upload_folder)
+
+    def test_run_load(self):
+        solutions = Solution.query.count()
+        results = run_load(f'http://127.0.0.1:{self.server.server_port}', 'deadline',
+                           workers=2, iterations=10, users=10)
+
+        self.assertEquals(results['errors'], 0)
+        self.assertEquals(set(results['routes']), {
+            'POST /api/v1/auth/token',
+            'GET /api/v1/student/homeworks',
+            'GET /api/v1/student/courses',
+            'POST /api/v1/student/homework/<id>/submit'
+        })
+        submissions = results['routes']['POST /api/v1/student/homework/<id>/submit']['requests']
+        self.assertEquals(Solution.query.count(), solutions + submissions)
+        for result in results['routes'].values():
+            self.assertLessEqual(result['p50'], result['p99'])
@@ -0,0 +1,73 @@
+import gc
+import json
+from threading import Thread
+
+from tests import BaseApiTest
+
+from homework_server.metrics import MetricsRegistry
+
+class MetricsTest(BaseApiTest):
+    def test_registry(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('jobs_total', 'Jobs', ['queue'])
+        histogram = registry.histogram('job_seconds', 'Job time', buckets=[0.1, 1.0])
+
+        # increments from many threads are all counted
+        def work():
+            for i in range(1000):
+                counter.inc(queue='default')
+        threads = [Thread(target=work) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc(queue='a "quoted" name')
+        for value in [0.05, 0.5, 5]:
+            histogram.observe(value)
+
+        text = registry.render()
+        self.assertIn('# TYPE jobs_total counter', text)
+        self.assertIn('jobs_total{queue="default"} 4000', text)
+        self.assertIn('jobs_total{queue="a \\"quoted\\" name"} 1', text)
+        self.assertIn('job_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('job_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('job_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('job_seconds_sum 5.55', text)
+        self.assertIn('job_seconds_count 3', text)
+
+    def test_finished_threads(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('requests_total', 'Requests')
+
+        # a thread per request leaves no shard behind, but its counts stay
+        for i in range(50):
+            thread = Thread(target=counter.inc)
+            thread.start()
+            thread.join()
+            del thread
+        gc.collect()
+        self.assertLessEqual(len(counter._shards), 1)
+        counter.inc()
+        self.assertIn('requests_total 51', registry.render())
+
+    def test_get_metrics(self):
+        # try to access as a student
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+        rv = self.client.get('/api/v1/admin/metrics', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 403)
+
+        # access as an administrator
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('admin', 'admin'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+        self.client.get('/api/v1/admin/teachers', headers=self.token_auth_header(token))
+        rv = self.client.get('/api/v1/admin/metrics', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        self.assertTrue(rv.headers['Content-Type'].startswith('text/plain'))
+
+        text = rv.data.decode()
+        self.assertIn('http_requests_total{endpoint="auth_api.get_token",method="POST",status="200"} 2', text)
+        self.assertIn('http_requests_total{endpoint="admin_api.get_metrics_text",method="GET",status="403"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{endpoint="admin_api.get_teachers"} 1', text)
@@ -142,6 +142,7 @@ class ModelsTest(BaseTest):
 
         # check if student has one course
         self.assertEquals(len(student.courses), 1)
+        self.assertEquals(course.student_count, 1)
 
         # create a homework and add student to it
         homework = Homework()
@@ -159,6 +160,12 @@ class ModelsTest(BaseTest):
 
         # check if student has one homework
         self.assertEquals(len(student.homeworks), 1)
+        self.assertEquals(homework.assigned_count, 1)
+
+        # remove the homework through the student's collection
+        student.homeworks.remove(homework)
+        db.session.commit()
+        self.assertEquals(homework.assigned_count, 0)
 
     def test_course(self):
         # create invalid course
@@ -0,0 +1,203 @@
+from io import BytesIO
+import json
+import shutil
+import tempfile
+
+from tests import BaseApiTest
+
+from homework_server import db
+from homework_server.models import Course, Homework, Solution, Student, Teacher
+
+QUERY_BUDGETS = {
+    'auth_api.get_token': 1,
+    'auth_api.check_token': 1,
+    'auth_api.revoke_token': 2,
+    'admin_api.get_teachers': 3,
+    'admin_api.create_teacher': 3,
+    'admin_api.create_teachers_bulk': 5,
+    'admin_api.remove_teacher': 5,
+    'admin_api.get_students': 3,
+    'admin_api.create_studetns': 3,
+    'admin_api.create_students_bulk': 5,
+    'admin_api.remove_student': 8,
+    'admin_api.get_pool_statistics': 1,
+    'admin_api.get_metrics_text': 1,
+    'teacher_api.get_courses': 6,
+    'teacher_api.create_course': 2,
+    'teacher_api.remove_course': 4,
+    'teacher_api.get_homeworks': 6,
+    'teacher_api.create_homework': 6,
+    'teacher_api.modify_homework': 7,
+    'teacher_api.remove_homework': 3,
+    'teacher_api.get_students': 3,
+    'teacher_api.get_summary': 4,
+    'teacher_api.get_upcoming_homeworks': 2,
+    'teacher_api.enroll_students': 4,
+    'teacher_api.get_solutions': 3,
+    'teacher_api.get_solution': 2,
+    'teacher_api.modify_solution': 3,
+    'student_api.get_courses': 6,
+    'student_api.get_applied_courses': 6,
+    'student_api.apply_for_course': 4,
+    'student_api.abandon_course': 4,
+    'student_api.get_homeworks_for_course': 6,
+    'student_api.apply_for_homework': 4,
+    'student_api.abandon_homework': 4,
+    'student_api.submit_solution': 5,
+    'student_api.get_homeworks': 12,
+    'student_api.get_solutions': 3,
+    'student_api.get_solution': 2,
+    'student_api.get_dashboard': 3,
+    'student_api.get_upcoming_homeworks': 2,
+    'search_api.search': 3
+}
+
+RELATIONSHIP_LOADS_ALLOWED = {
+    'admin_api.remove_teacher',
+    'admin_api.remove_student'
+}
+
+class QueryBudgetTest(BaseApiTest):
+    def configure(self, config):
+        self.upload_folder = tempfile.mkdtemp()
+        config['UPLOAD_FOLDER'] = self.upload_folder
+        config['JOBS_MODE'] = 'manual'
+
+    def setUp(self):
+        super(QueryBudgetTest, self).setUp()
+
+        # three courses with three homeworks and two solutions each
+        self.courses = []
+        self.homeworks = []
+        self.solutions = []
+        for i in range(3):
+            course = Course()
+            course.from_dict({
+                'name': f'course{i}',
+                'description': 'course'
+            })
+            course.teacher_id = self.teacher.id
+            course.students.append(self.student)
+            db.session.add(course)
+            db.session.commit()
+            self.courses.append(course.id)
+
+            for j in range(3):
+                homework = Homework()
+                homework.from_dict({
+                    'name': f'homework{i}{j}',
+                    'description': 'homework',
+                    'deadline': '2018-11-08 08:48:11',
+                    'headcount': 10,
+                    'self_assignable': True
+                })
+                homework.course_id = course.id
+                homework.students.append(self.student)
+                db.session.add(homework)
+                db.session.commit()
+                self.homeworks.append(homework.id)
+
+                for k in range(2):
+                    solution = Solution()
+                    solution.homework_id = homework.id
+                    solution.file_path = f'{self.upload_folder}/solution{i}{j}{k}.txt'
+                    db.session.add(solution)
+                    db.session.commit()
+                    self.solutions.append(solution.id)
+
+        self.tokens = {}
+        for username in ['admin', 'teacher', 'student']:
+            rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header(username, username))
+            self.tokens[username] = json.loads(rv.data.decode())['token']
+
+    def tearDown(self):
+        super(QueryBudgetTest, self).tearDown()
+        shutil.rmtree(self.upload_folder)
+
+    def request(self, user, method, url, endpoint, **kwargs):
+        headers = kwargs.pop('headers', None) or self.token_auth_header(self.tokens[user])
+        raiseload = endpoint not in RELATIONSHIP_LOADS_ALLOWED
+        with self.query_budget(QUERY_BUDGETS[endpoint], raiseload):
+            rv = self.client.open(url, method=method, headers=headers, **kwargs)
+        self.assertLess(rv.status_code, 400, endpoint)
+        return rv
+
+    def test_budgets_cover_every_endpoint(self):
+        endpoints = {rule.endpoint for rule in self.app.url_map.iter_rules() if rule.endpoint != 'static'}
+        self.assertEquals(endpoints, set(QUERY_BUDGETS))
+
+    def test_auth_api(self):
+        self.request('admin', 'POST', '/api/v1/auth/token', 'auth_api.get_token',
+                     headers=self.basic_auth_header('admin', 'admin'))
+        self.request('admin', 'GET', '/api/v1/auth/token', 'auth_api.check_token')
+        self.request('admin', 'DELETE', '/api/v1/auth/token', 'auth_api.revoke_token')
+
+    def test_admin_api(self):
+        self.request('admin', 'GET', '/api/v1/admin/teachers', 'admin_api.get_teachers')
+        self.request('admin', 'POST', '/api/v1/admin/teachers', 'admin_api.create_teacher',
+                     data=json.dumps({'name': 'teacher2', 'username': 'teacher2', 'password': 'teacher2'}))
+        self.request('admin', 'POST', '/api/v1/admin/teachers/bulk', 'admin_api.create_teachers_bulk',
+                     data=json.dumps([{'name': f'bulk{i}', 'username': f'bulk{i}', 'password': 'bulk'} for i in range(3)]))
+        teacher = Teacher.query.filter_by(username='teacher2').first()
+        self.request('admin', 'DELETE', f'/api/v1/admin/teacher/{teacher.id}', 'admin_api.remove_teacher')
+        self.request('admin', 'GET', '/api/v1/admin/students', 'admin_api.get_students')
+        self.request('admin', 'POST', '/api/v1/admin/students', 'admin_api.create_studetns',
+                     data=json.dumps({'name': 'student2', 'username': 'student2', 'password': 'student2'}))
+        self.request('admin', 'POST', '/api/v1/admin/students/bulk', 'admin_api.create_students_bulk',
+                     data=json.dumps([{'name': f'pupil{i}', 'username': f'pupil{i}', 'password': 'pupil'} for i in range(3)]))
+        student = Student.query.filter_by(username='student2').first()
+        self.request('admin', 'DELETE', f'/api/v1/admin/student/{student.id}', 'admin_api.remove_student')
+        self.request('admin', 'GET', '/api/v1/admin/database/pool', 'admin_api.get_pool_statistics')
+        self.request('admin', 'GET', '/api/v1/admin/metrics', 'admin_api.get_metrics_text')
+
+    def test_teacher_api(self):
+        course_id, homework_id, solution_id = self.courses[0], self.homeworks[0], self.solutions[0]
+        self.request('teacher', 'GET', '/api/v1/teacher/courses', 'teacher_api.get_courses')
+        self.request('teacher', 'POST', '/api/v1/teacher/courses', 'teacher_api.create_course',
+                     data=json.dumps({'name': 'course', 'description': 'course'}))
+        self.request('teacher', 'GET', f'/api/v1/teacher/course/{course_id}/homeworks', 'teacher_api.get_homeworks')
+        self.request('teacher', 'POST', f'/api/v1/teacher/course/{course_id}/homeworks', 'teacher_api.create_homework',
+                     data=json.dumps({
+                         'name': 'homework',
+                         'description': 'homework',
+                         'deadline': '2018-11-08 08:48:11',
+                         'headcount': 4,
+                         'self_assignable': False,
+                         'students': [self.student.id]
+                     }))
+        self.request('teacher', 'PUT', f'/api/v1/teacher/homework/{homework_id}', 'teacher_api.modify_homework',
+                     data=json.dumps({'name': 'renamed', 'students': {'remove': [self.student.id]}}))
+        self.request('teacher', 'GET', f'/api/v1/teacher/course/{course_id}/students', 'teacher_api.get_students')
+        self.request('teacher', 'GET', f'/api/v1/teacher/course/{course_id}/summary', 'teacher_api.get_summary')
+        self.request('teacher', 'GET', '/api/v1/teacher/homeworks/upcoming', 'teacher_api.get_upcoming_homeworks')
+        self.request('teacher', 'POST', f'/api/v1/teacher/course/{course_id}/students', 'teacher_api.enroll_students',
+                     data=json.dumps({'students': ['student', 'nobody']}))
+        self.request('teacher', 'GET', f'/api/v1/teacher/homework/{homework_id}/solutions', 'teacher_api.get_solutions')
+        self.request('teacher', 'GET', f'/api/v1/teacher/solution/{solution_id}', 'teacher_api.get_solution')
+        self.request('teacher', 'PUT', f'/api/v1/teacher/solution/{solution_id}', 'teacher_api.modify_solution',
+                     data=json.dumps({'status': 'accepted'}))
+        self.request('teacher', 'DELETE', f'/api/v1/teacher/homework/{homework_id}', 'teacher_api.remove_homework')
+        self.request('teacher', 'DELETE', f'/api/v1/teacher/course/{course_id}', 'teacher_api.remove_course')
+
+    def test_student_api(self):
+        course_id, homework_id, solution_id = self.courses[0], self.homeworks[0], self.solutions[0]
+        self.request('student', 'GET', '/api/v1/student/courses/all', 'student_api.get_courses')
+        self.request('student', 'GET', '/api/v1/student/courses', 'student_api.get_applied_courses')
+        self.request('student', 'DELETE', f'/api/v1/student/course/{course_id}', 'student_api.abandon_course')
+        self.request('student', 'POST', f'/api/v1/student/course/{course_id}', 'student_api.apply_for_course')
+        self.request('student', 'GET', f'/api/v1/student/course/{course_id}/homeworks', 'student_api.get_homeworks_for_course')
+        self.request('student', 'DELETE', f'/api/v1/student/homework/{homework_id}', 'student_api.abandon_homework')
+        self.request('student', 'POST', f'/api/v1/student/homework/{homework_id}', 'student_api.apply_for_homework')
+        self.request('student', 'POST', f'/api/v1/student/homework/{homework_id}/submit', 'student_api.submit_solution',
+                     headers={'Authorization': f'Bearer {self.tokens["student"]}'},
+                     data={'file': (BytesIO(b'solution'), 'solution.txt')},
+                     content_type='multipart/form-data')
+        self.request('student', 'GET', '/api/v1/student/homeworks', 'student_api.get_homeworks')
+        self.request('student', 'GET', '/api/v1/student/dashboard', 'student_api.get_dashboard')
+        self.request('student', 'GET', '/api/v1/student/homeworks/upcoming', 'student_api.get_upcoming_homeworks')
+        self.request('student', 'GET', f'/api/v1/student/homework/{homework_id}/solutions', 'student_api.get_solutions')
+        self.request('student', 'GET', f'/api/v1/student/solution/{solution_id}', 'student_api.get_solution')
+
+    def test_search_api(self):
+        for user in ['admin', 'teacher', 'student']:
+            self.request(user, 'GET', '/api/v1/search?q=course', 'search_api.search')
@@ -0,0 +1,82 @@
+import json
+from time import time
+
+from tests import BaseApiTest
+
+from homework_server.ratelimit import RateLimiter
+from homework_server.server import ACCEPTED_AT_KEY
+
+class RateLimitTest(BaseApiTest):
+    def configure(self, config):
+        config['RATE_LIMIT_ENABLED'] = True
+        config['RATE_LIMIT_RATE'] = 0.01
+        config['RATE_LIMIT_BURST'] = 10
+        config['LOAD_SHED_QUEUE_MS'] = 500
+
+    def test_token_bucket(self):
+        now = [0.0]
+        limiter = RateLimiter(rate=1, capacity=3, max_clients=2, clock=lambda: now[0])
+
+        # the burst is spent, then requests wait for refills
+        self.assertEquals([limiter.take('a') for i in range(3)], [0, 0, 0])
+        self.assertEquals(limiter.take('a'), 1.0)
+        now[0] = 1.0
+        self.assertEquals(limiter.take('a'), 0)
+        self.assertEquals(limiter.take('a', 2), 2.0)
+
+        # costs above the capacity cost the whole bucket
+        self.assertEquals(limiter.take('b', 100), 0)
+        self.assertEquals(limiter.take('b'), 1.0)
+
+        # the least recently used client is forgotten
+        limiter.take('c')
+        self.assertEquals(list(limiter.buckets), ['b', 'c'])
+
+    def test_rate_limited_endpoint(self):
+        # logging in costs five tokens of ten
+        for i in range(2):
+            rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+            self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        self.assertEquals(rv.status_code, 429)
+        self.assertEquals(rv.headers['Retry-After'], '500')
+
+        # other addresses and verified users keep their own buckets
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('teacher', 'teacher'),
+                              environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        self.assertEquals(rv.status_code, 200)
+        rv = self.client.get('/api/v1/student/courses', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+
+    def test_unverified_credentials(self):
+        # made-up tokens and usernames all spend the address's bucket
+        for i in range(10):
+            rv = self.client.get('/api/v1/student/courses', headers=self.token_auth_header(f'random{i}'))
+            self.assertEquals(rv.status_code, 401)
+        rv = self.client.get('/api/v1/student/courses', headers=self.token_auth_header('random'))
+        self.assertEquals(rv.status_code, 429)
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('nobody', 'nobody'))
+        self.assertEquals(rv.status_code, 429)
+        self.assertEquals(list(self.app.extensions['rate_limiter'].buckets), ['ip:127.0.0.1'])
+
+        # verified users are not held back by their address
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'),
+                              environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        token = json.loads(rv.data.decode())['token']
+        rv = self.client.get('/api/v1/student/courses', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+
+    def test_load_shedding(self):
+        headers = self.basic_auth_header('student', 'student')
+
+        # requests that queued longer than the threshold are shed
+        rv = self.client.post('/api/v1/auth/token', headers=headers, environ_base={ACCEPTED_AT_KEY: time() - 1.5})
+        self.assertEquals(rv.status_code, 503)
+        self.assertEquals(rv.headers['Retry-After'], '2')
+        rv = self.client.post('/api/v1/auth/token', headers=dict(headers, **{'X-Request-Start': f't={int((time() - 1) * 1e6)}'}))
+        self.assertEquals(rv.status_code, 503)
+
+        # fresh requests are served
+        rv = self.client.post('/api/v1/auth/token', headers=dict(headers, **{'X-Request-Start': f't={time():.3f}'}))
+        self.assertEquals(rv.status_code, 200)
\ No newline at end of file
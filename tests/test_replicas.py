@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import tempfile
+
+from tests import BaseApiTest
+
+from homework_server import db
+from homework_server.models import Course, Student
+
+class ReplicaTest(BaseApiTest):
+    transactional = False
+
+    def configure(self, config):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.primary_path = os.path.join(self.tmp_dir, 'primary.sqlite')
+        self.replica_path = os.path.join(self.tmp_dir, 'replica.sqlite')
+        config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + self.primary_path
+
+    def tearDown(self):
+        super(ReplicaTest, self).tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def create_course(self, name):
+        course = Course()
+        course.from_dict({
+            'name': name,
+            'description': name
+        })
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.commit()
+        return course
+
+    def get_course_names(self, token, path='/api/v1/student/courses/all'):
+        rv = self.client.get(path, headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        return [course['name'] for course in json.loads(rv.data.decode())['courses']]
+
+    def get_token(self, username, password):
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header(username, password))
+        self.assertEquals(rv.status_code, 200)
+        return json.loads(rv.data.decode())['token']
+
+    def test_read_routing(self):
+        # get tokens for two students
+        other = Student()
+        other.from_dict({
+            'name': 'other',
+            'username': 'other'
+        })
+        other.set_password('other')
+        db.session.add(other)
+        db.session.commit()
+        token = self.get_token('student', 'student')
+        other_token = self.get_token('other', 'other')
+
+        # create a course with the student and copy the database to the replica
+        course = self.create_course('c1')
+        course.students.append(self.student)
+        db.session.commit()
+        db.session.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        shutil.copy(self.primary_path, self.replica_path)
+
+        # enable a working and a broken replica
+        self.app.config['SQLALCHEMY_REPLICA_URIS'] = [
+            'sqlite:///' + self.replica_path,
+            'sqlite:///' + os.path.join(self.tmp_dir, 'missing', 'replica.sqlite')
+        ]
+        self.app.config['REPLICA_PIN_SECONDS'] = 0
+
+        # create a course with the other student on the primary only
+        other_course = self.create_course('c2')
+        other_course.students.append(other)
+        db.session.commit()
+
+        # reads are served by the healthy replica
+        self.assertEquals(self.get_course_names(token, '/api/v1/student/courses'), ['c1'])
+        self.assertEquals(self.get_course_names(other_token, '/api/v1/student/courses'), [])
+        replicas = self.app.extensions['replicas']
+        self.assertTrue(replicas.healthy['replica_0'])
+        self.assertFalse(replicas.healthy['replica_1'])
+
+        # cached responses are computed on the primary
+        self.assertEquals(self.get_course_names(token), ['c1', 'c2'])
+        self.assertEquals(self.get_course_names(other_token), ['c1', 'c2'])
+
+        # a write pins the client to the primary
+        self.app.config['REPLICA_PIN_SECONDS'] = 60
+        rv = self.client.post(f'/api/v1/student/course/{other_course.id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        self.assertEquals(self.get_course_names(token, '/api/v1/student/courses'), ['c1', 'c2'])
+
+        # the pin belongs to the writer, not to every client behind its address
+        self.assertEquals(self.get_course_names(other_token, '/api/v1/student/courses'), [])
+
+    def test_prefork_reads_primary(self):
+        token = self.get_token('student', 'student')
+
+        # pins are per process, so several workers read from the primary
+        course = self.create_course('c1')
+        db.session.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        shutil.copy(self.primary_path, self.replica_path)
+        self.app.config['SQLALCHEMY_REPLICA_URIS'] = ['sqlite:///' + self.replica_path]
+        self.app.config['SERVER_WORKERS'] = 2
+        course.students.append(self.student)
+        db.session.commit()
+        self.assertEquals(self.get_course_names(token, '/api/v1/student/courses'), ['c1'])
+
+    def test_without_healthy_replica(self):
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # only a broken replica is configured
+        self.app.config['SQLALCHEMY_REPLICA_URIS'] = ['sqlite:///' + os.path.join(self.tmp_dir, 'missing', 'replica.sqlite')]
+        self.app.config['REPLICA_PIN_SECONDS'] = 0
+
+        # reads fall back to the primary
+        self.create_course('c1')
+        self.assertEquals(self.get_course_names(token), ['c1'])
@@ -0,0 +1,101 @@
+from sqlalchemy import inspect
+
+from tests import BaseTest
+
+from homework_server import db
+from homework_server.models import Course, Homework, Solution, Student, Teacher, students_courses_table, students_homeworks_table
+from homework_server.schema import upgrade_schema
+
+class SchemaTest(BaseTest):
+    transactional = False
+
+    def query_plan(self, query):
+        statement = query.statement if hasattr(query, 'statement') else query
+        sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+        rows = db.session.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+        return ' | '.join(row[-1] for row in rows)
+
+    def test_association_indexes(self):
+        # students of a course
+        plan = self.query_plan(
+            db.select([students_courses_table.c.student_id]).where(students_courses_table.c.course_id==1))
+        self.assertIn('ix_students_courses_course_id_student_id', plan)
+
+        # students of a homework
+        plan = self.query_plan(
+            db.select([students_homeworks_table.c.student_id]).where(students_homeworks_table.c.homework_id==1))
+        self.assertIn('ix_students_homeworks_homework_id_student_id', plan)
+
+    def test_foreign_key_indexes(self):
+        # courses of a teacher
+        plan = self.query_plan(Course.query.filter(Course.teacher_id==1))
+        self.assertIn('ix_courses_teacher_id', plan)
+
+        # homeworks of a course ordered by name
+        plan = self.query_plan(Homework.query.join(Course, Course.id==Homework.course_id)
+                                             .filter(Course.id==1)
+                                             .order_by(Homework.name))
+        self.assertIn('ix_homeworks_course_id_name', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        # solutions of a homework ordered by submission time
+        plan = self.query_plan(Solution.query.filter(Solution.homework_id==1)
+                                             .order_by(Solution.submitted_at.desc()))
+        self.assertIn('ix_solutions_homework_id_submitted_at', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        # solutions of a homework counted by status and by student
+        plan = self.query_plan(db.session.query(Solution.status, db.func.count())
+                                         .filter(Solution.homework_id==1)
+                                         .group_by(Solution.status))
+        self.assertIn('ix_solutions_homework_id_status', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        plan = self.query_plan(db.session.query(db.func.count(db.distinct(Solution.student_id)))
+                                         .filter(Solution.homework_id==1))
+        self.assertIn('ix_solutions_homework_id_student_id', plan)
+
+        # homeworks due in a window ordered by deadline
+        plan = self.query_plan(Homework.query.filter(Homework.deadline >= '2018-11-01', Homework.deadline < '2018-11-08')
+                                             .order_by(Homework.deadline, Homework.id))
+        self.assertIn('ix_homeworks_deadline', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_upgrade_schema(self):
+        # simulate a database created before the indexes existed
+        db.session.execute('DROP INDEX ix_solutions_homework_id_submitted_at')
+        db.session.execute('DROP INDEX ix_students_courses_course_id_student_id')
+        db.session.commit()
+
+        # upgrade creates only the missing indexes
+        created = upgrade_schema()
+        self.assertEquals(created, ['ix_students_courses_course_id_student_id', 'ix_solutions_homework_id_submitted_at'])
+        indexes = [index['name'] for index in inspect(db.engine).get_indexes('solutions')]
+        self.assertIn('ix_solutions_homework_id_submitted_at', indexes)
+
+        # upgrading again is a no-op
+        self.assertEquals(upgrade_schema(), [])
+
+    def test_upgrade_counters(self):
+        # create a course with a student
+        teacher = Teacher()
+        teacher.from_dict({'name': 'teacher', 'username': 'teacher', 'password': 'teacher'})
+        student = Student()
+        student.from_dict({'name': 'student', 'username': 'student', 'password': 'student'})
+        db.session.add_all([teacher, student])
+        db.session.commit()
+        course = Course()
+        course.from_dict({'name': 'course', 'description': 'course'})
+        course.teacher_id = teacher.id
+        course.students.append(student)
+        db.session.add(course)
+        db.session.commit()
+
+        # simulate a database created before the counters existed
+        db.session.execute('ALTER TABLE courses DROP COLUMN student_count')
+        db.session.commit()
+
+        # upgrade adds the column and backfills it
+        created = upgrade_schema()
+        self.assertEquals(created, ['courses.student_count'])
+        db.session.expire_all()
+        self.assertEquals(Course.query.first().student_count, 1)
@@ -0,0 +1,103 @@
+import json
+
+from tests import BaseApiTest, password_hash
+
+from homework_server import db
+from homework_server.models import Course, Homework, Teacher
+
+class SearchTest(BaseApiTest):
+    def setUp(self):
+        super(SearchTest, self).setUp()
+
+        self.other_teacher = Teacher()
+        self.other_teacher.from_dict({
+            'name': 'other',
+            'username': 'other'
+        })
+        self.other_teacher.password_hash = password_hash('other')
+        db.session.add(self.other_teacher)
+        db.session.commit()
+
+        self.courses = {}
+        for name, description, teacher in [('Algebra', 'Linear algebra and matrices', self.teacher),
+                                           ('Analysis', 'Limits, series and integrals', self.teacher),
+                                           ('History', 'A course about the history of algebra', self.other_teacher)]:
+            course = Course()
+            course.from_dict({'name': name, 'description': description})
+            course.teacher_id = teacher.id
+            db.session.add(course)
+            self.courses[name] = course
+        db.session.commit()
+        self.courses['Algebra'].add_student(self.student.id)
+
+        for name, description, course in [('Matrix algebra', 'Invert matrices', 'Algebra'),
+                                          ('Series', 'Convergent series', 'Analysis'),
+                                          ('Algebra essay', 'Write about algebra', 'History')]:
+            homework = Homework()
+            homework.from_dict({
+                'name': name,
+                'description': description,
+                'deadline': '2018-11-08 08:48:11',
+                'headcount': 4,
+                'self_assignable': False
+            })
+            homework.course_id = self.courses[course].id
+            db.session.add(homework)
+        db.session.commit()
+
+    def search(self, username, q, **args):
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header(username, username))
+        token = json.loads(rv.data.decode())['token']
+        rv = self.client.get('/api/v1/search', query_string=dict(args, q=q), headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        return json.loads(rv.data.decode())
+
+    def names(self, data):
+        return [(result['type'], result['name']) for result in data['results']]
+
+    def test_search_scopes(self):
+        # students find every course but only homeworks of their courses
+        data = self.search('student', 'algebra')
+        names = self.names(data)
+        self.assertEquals(sorted(names[:2]), [('course', 'Algebra'), ('homework', 'Matrix algebra')])
+        self.assertEquals(names[2], ('course', 'History'))
+        homework = [result for result in data['results'] if result['type'] == 'homework'][0]
+        self.assertEquals((homework['course'], homework['course_id']), ('Algebra', self.courses['Algebra'].id))
+
+        # teachers find homeworks of their own courses, name matches first
+        names = self.names(self.search('other', 'algebra'))
+        self.assertEquals(sorted(names[:2]), [('course', 'Algebra'), ('homework', 'Algebra essay')])
+        self.assertEquals(names[2], ('course', 'History'))
+        self.assertEquals(self.names(self.search('teacher', 'ser')), [('homework', 'Series'), ('course', 'Analysis')])
+
+        # administrators find everything
+        self.assertEquals(len(self.search('admin', 'algebra')['results']), 4)
+
+    def test_index_follows_changes(self):
+        # renamed and deleted rows are reflected at once
+        self.courses['Analysis'].name = 'Calculus'
+        db.session.commit()
+        self.assertEquals(self.names(self.search('admin', 'calculus')), [('course', 'Calculus')])
+        self.courses['History'].mark_deleted()
+        db.session.commit()
+        self.assertEquals(self.names(self.search('admin', 'essay')), [])
+
+        # removed rows leave the index
+        homework = Homework.query.filter_by(name='Series').first()
+        db.session.delete(homework)
+        db.session.commit()
+        self.assertEquals(self.names(self.search('admin', 'convergent')), [])
+
+    def test_pagination(self):
+        data = self.search('admin', 'algebra', limit=2)
+        self.assertEquals(len(data['results']), 2)
+        self.assertIsNone(data['prev'])
+        rv = self.client.get(data['next'], headers=self.token_auth_header(
+            json.loads(self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('admin', 'admin')).data.decode())['token']))
+        self.assertEquals(len(json.loads(rv.data.decode())['results']), 2)
+
+    def test_empty_query(self):
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        token = json.loads(rv.data.decode())['token']
+        rv = self.client.get('/api/v1/search?q=%20!', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 400)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import json
+import os
+import shutil
+import tempfile
+from functools import partial
+from urllib.request import Request, urlopen
+
+from tests import BaseApiTest
+
+from homework_server import create_app
+from homework_server.loadtest import wait_until_ready
+from homework_server.server import PreforkServer
+
+class PreforkServerTest(BaseApiTest):
+    transactional = False
+
+    def configure(self, config):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.database_uri = 'sqlite:///' + os.path.join(self.tmp_dir, 'db.sqlite')
+        config['SQLALCHEMY_DATABASE_URI'] = self.database_uri
+
+    def setUp(self):
+        super(PreforkServerTest, self).setUp()
+        self.server = PreforkServer(partial(create_app, 'testing', SQLALCHEMY_DATABASE_URI=self.database_uri),
+                                    port=0, workers=2, threads=2, graceful_timeout=5)
+        self.server.log = lambda message: None
+        self.server.start()
+        self.base_url = f'http://127.0.0.1:{self.server.port}'
+
+    def tearDown(self):
+        if self.server.workers:
+            self.server.stop()
+        super(PreforkServerTest, self).tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_token(self):
+        request = Request(self.base_url + '/api/v1/auth/token', method='POST',
+                          headers=self.basic_auth_header('student', 'student'))
+        with urlopen(request, timeout=10) as response:
+            self.assertEquals(response.status, 200)
+            return json.loads(response.read().decode())['token']
+
+    def test_workers_serve_requests(self):
+        wait_until_ready(self.base_url)
+        self.assertEquals(len(self.server.workers), 2)
+        for i in range(4):
+            self.assertIsNotNone(self.get_token())
+
+    def test_reload_and_stop(self):
+        wait_until_ready(self.base_url)
+        old_workers = set(self.server.workers)
+
+        # reload replaces every worker and keeps serving
+        self.server.reload()
+        self.assertIsNotNone(self.get_token())
+        self.assertEquals(len(self.server.current_workers()), 2)
+        self.assertFalse(old_workers & set(self.server.current_workers()))
+
+        # stop waits for every worker to exit
+        self.server.stop()
+        self.assertEquals(self.server.workers, {})
\ No newline at end of file
@@ -1,7 +1,12 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 from io import BytesIO
+import os
 import shutil
+import tempfile
+from threading import Thread
+
+from sqlalchemy import event
 
 from tests import BaseApiTest
 
@@ -68,6 +73,10 @@ class StudentApiTest(BaseApiTest):
         rv = self.client.post(f'/api/v1/student/course/{course.id}', headers=self.token_auth_header(token))
         self.assertEquals(rv.status_code, 200)
 
+        # apply again
+        rv = self.client.post(f'/api/v1/student/course/{course.id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 304)
+
         # check data
         course = Course.query.filter_by(name='course').first()
         self.assertIsNotNone(course)
@@ -102,6 +111,10 @@ class StudentApiTest(BaseApiTest):
         rv = self.client.delete(f'/api/v1/student/course/{course.id}', headers=self.token_auth_header(token))
         self.assertEquals(rv.status_code, 200)
 
+        # abandon again
+        rv = self.client.delete(f'/api/v1/student/course/{course.id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 304)
+
         # check data
         course = Course.query.filter_by(name='course').first()
         self.assertIsNotNone(course)
@@ -208,6 +221,10 @@ class StudentApiTest(BaseApiTest):
         rv = self.client.post(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(token))
         self.assertEquals(rv.status_code, 200)
 
+        # apply again
+        rv = self.client.post(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 304)
+
         # check data
         homework = Homework.query.filter_by(name='homework').first()
         self.assertIsNotNone(homework)
@@ -220,6 +237,70 @@ class StudentApiTest(BaseApiTest):
         self.assertEquals(len(homework.students), 1)
         self.assertEquals(homework.students[0].name, 'student')
 
+    def test_apply_for_homework_headcount(self):
+        # create a course
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.commit()
+
+        # create a homework for a single student
+        homework = Homework()
+        homework.from_dict({
+            'name': 'homework',
+            'description': 'homework',
+            'deadline': '2018-11-08 08:48:11',
+            'headcount': 1,
+            'self_assignable': True
+        })
+        homework.course_id = course.id
+        db.session.add(homework)
+        db.session.commit()
+
+        # create another student
+        student2 = Student()
+        student2.from_dict({
+            'name': 'student2',
+            'username': 'student2'
+        })
+        student2.password_hash = self.student.password_hash
+        db.session.add(student2)
+        db.session.commit()
+
+        # get tokens
+        tokens = []
+        for username in ['student', 'student2']:
+            rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header(username, 'student'))
+            self.assertEquals(rv.status_code, 200)
+            tokens.append(json.loads(rv.data.decode())['token'])
+
+        # the first student takes the only place
+        rv = self.client.post(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(tokens[0]))
+        self.assertEquals(rv.status_code, 200)
+
+        # the homework is full for the second student
+        rv = self.client.post(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(tokens[1]))
+        self.assertEquals(rv.status_code, 409)
+        homework = Homework.query.filter_by(name='homework').first()
+        self.assertEquals(homework.assigned_count, 1)
+        self.assertEquals([student.name for student in homework.students], ['student'])
+
+        # the place is released by abandoning the homework
+        rv = self.client.delete(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(tokens[0]))
+        self.assertEquals(rv.status_code, 200)
+        rv = self.client.post(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(tokens[1]))
+        self.assertEquals(rv.status_code, 200)
+
+        # counters are part of the list responses
+        rv = self.client.get(f'/api/v1/student/course/{course.id}/homeworks', headers=self.token_auth_header(tokens[1]))
+        self.assertEquals(rv.status_code, 200)
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['homeworks'][0]['assigned_count'], 1)
+
     def test_abandon_homework(self):
         # create a course
         course = Course()
@@ -259,6 +340,10 @@ class StudentApiTest(BaseApiTest):
         rv = self.client.delete(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(token))
         self.assertEquals(rv.status_code, 200)
 
+        # abandon again
+        rv = self.client.delete(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 304)
+
         # check data
         homework = Homework.query.filter_by(name='homework').first()
         self.assertIsNotNone(homework)
@@ -434,6 +519,62 @@ class StudentApiTest(BaseApiTest):
         self.assertEquals(data['homeworks'][1]['self_assignable'], False)
         self.assertEquals(data['homeworks'][1]['course'], 'course2')
 
+    def test_get_upcoming_homeworks(self):
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.commit()
+
+        # create homeworks due at different times, all but one assigned
+        now = datetime.utcnow()
+        for name, days, assigned in [('past', -1, True), ('third', 3, True), ('first', 1, True), ('second', 2, True),
+                                     ('later', 10, True), ('other', 1, False), ('removed', 1, True)]:
+            homework = Homework()
+            homework.from_dict({
+                'name': name,
+                'description': 'homework',
+                'deadline': now + timedelta(days=days),
+                'headcount': 4,
+                'self_assignable': False
+            })
+            homework.course_id = course.id
+            if assigned:
+                homework.students.append(self.student)
+            if name == 'removed':
+                homework.mark_deleted()
+            db.session.add(homework)
+        db.session.commit()
+
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        token = json.loads(rv.data.decode())['token']
+
+        # homeworks due within a week come by deadline, a page at a time
+        rv = self.client.get('/api/v1/student/homeworks/upcoming?limit=2', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        data = json.loads(rv.data.decode())
+        self.assertEquals([homework['name'] for homework in data['homeworks']], ['first', 'second'])
+        self.assertEquals(data['homeworks'][0]['course'], 'course')
+        rv = self.client.get(data['next'], headers=self.token_auth_header(token))
+        data = json.loads(rv.data.decode())
+        self.assertEquals([homework['name'] for homework in data['homeworks']], ['third'])
+        self.assertIsNone(data['next'])
+
+        # the window can be widened
+        rv = self.client.get('/api/v1/student/homeworks/upcoming?within=30', headers=self.token_auth_header(token))
+        data = json.loads(rv.data.decode())
+        self.assertEquals([homework['name'] for homework in data['homeworks']], ['first', 'second', 'third', 'later'])
+
+        # malformed cursors and out-of-range windows or page sizes are rejected
+        for args in ['after=x', 'within=-1', 'within=367', 'within=3000000', 'limit=0', 'limit=101']:
+            rv = self.client.get(f'/api/v1/student/homeworks/upcoming?{args}', headers=self.token_auth_header(token))
+            self.assertEquals(rv.status_code, 400, args)
+        rv = self.client.get('/api/v1/student/homeworks/upcoming?within=366&limit=100', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+
     def test_get_solutions(self):
         # create a homework
         course = Course()
@@ -550,3 +691,184 @@ class StudentApiTest(BaseApiTest):
         self.assertIsNotNone(data['solution']['id'])
         self.assertEquals(data['solution']['status'], 'status')
         self.assertTrue(abs((submitted_at - datetime.strptime(data['solution']['submitted_at'], '%Y-%m-%d %H:%M:%S')).seconds) < 1)
+
+    def test_get_dashboard(self):
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('student', 'student'))
+        token = json.loads(rv.data.decode())['token']
+
+        # create courses with homeworks, some assigned and some solved twice
+        for i in range(3):
+            course = Course()
+            course.from_dict({
+                'name': f'course{i}',
+                'description': 'course'
+            })
+            course.teacher_id = self.teacher.id
+            db.session.add(course)
+            db.session.commit()
+            if i < 2:
+                course.add_student(self.student.id)
+            for j in range(2):
+                homework = Homework()
+                homework.from_dict({
+                    'name': f'homework{i}{j}',
+                    'description': 'homework',
+                    'deadline': f'2018-11-0{8 - i} 08:48:1{j}',
+                    'headcount': 4,
+                    'self_assignable': False
+                })
+                homework.course_id = course.id
+                if i < 2:
+                    homework.students.append(self.student)
+                db.session.add(homework)
+                db.session.commit()
+                for status in ['first', 'second'][:i + j]:
+                    solution = Solution()
+                    solution.from_dict({'status': status})
+                    solution.file_path = 'f'
+                    solution.homework_id = homework.id
+                    solution.student_id = self.student.id
+                    db.session.add(solution)
+                    db.session.commit()
+
+        # the dashboard takes the same number of queries however much there is
+        with self.query_budget(3):
+            rv = self.client.get('/api/v1/student/dashboard', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+
+        # check returned data
+        data = json.loads(rv.data.decode())
+        self.assertEquals([course['name'] for course in data['courses']], ['course0', 'course1'])
+        self.assertEquals(data['courses'][0]['teacher'], 'teacher')
+        self.assertEquals(data['courses'][0]['student_count'], 1)
+        self.assertEquals([homework['name'] for homework in data['homeworks']],
+                          ['homework10', 'homework11', 'homework00', 'homework01'])
+        self.assertEquals(data['homeworks'][0]['deadline'], '2018-11-07 08:48:10')
+        self.assertEquals(data['homeworks'][0]['course'], 'course1')
+        self.assertEquals([homework['latest_solution'] and homework['latest_solution']['status']
+                           for homework in data['homeworks']], ['first', 'second', None, 'first'])
+
+class HeadcountConcurrencyTest(BaseApiTest):
+    transactional = False
+
+    def configure(self, config):
+        self.tmp_dir = tempfile.mkdtemp()
+        config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.tmp_dir, 'db.sqlite')
+
+    def tearDown(self):
+        super(HeadcountConcurrencyTest, self).tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parallel_sign_ups(self):
+        # create a course
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.commit()
+
+        # create a homework with three places
+        homework = Homework()
+        homework.from_dict({
+            'name': 'homework',
+            'description': 'homework',
+            'deadline': '2018-11-08 08:48:11',
+            'headcount': 3,
+            'self_assignable': True
+        })
+        homework.course_id = course.id
+        db.session.add(homework)
+        db.session.commit()
+
+        # create students with tokens
+        tokens = []
+        for i in range(10):
+            student = Student()
+            student.from_dict({
+                'name': f's{i}',
+                'username': f's{i}'
+            })
+            student.password_hash = self.student.password_hash
+            db.session.add(student)
+            tokens.append(student.get_token())
+        db.session.commit()
+
+        # sign up in parallel
+        status_codes = []
+        def sign_up(token):
+            rv = self.app.test_client().post(f'/api/v1/student/homework/{homework.id}', headers=self.token_auth_header(token))
+            status_codes.append(rv.status_code)
+        threads = [Thread(target=sign_up, args=(token,)) for token in tokens]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # check that exactly three students got a place
+        self.assertEquals(sorted(status_codes), [200] * 3 + [409] * 7)
+        db.session.expire_all()
+        homework = Homework.query.filter_by(name='homework').first()
+        self.assertEquals(homework.assigned_count, 3)
+        self.assertEquals(len(homework.students), 3)
+
+    def test_assignment_races(self):
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.commit()
+        homework = Homework()
+        homework.from_dict({
+            'name': 'homework',
+            'description': 'homework',
+            'deadline': '2018-11-08 08:48:11',
+            'headcount': 3,
+            'self_assignable': True
+        })
+        homework.course_id = course.id
+        homework.students.append(self.student)
+        db.session.add(homework)
+        db.session.commit()
+        homework_id = homework.id
+        student_token = self.student.get_token()
+        teacher_token = self.teacher.get_token()
+        db.session.commit()
+
+        def teacher_request(students, prefix, method):
+            # the student's request runs between the teacher's read and write
+            status_codes = []
+            def student_request():
+                rv = self.app.test_client().open(f'/api/v1/student/homework/{homework_id}', method=method,
+                                                 headers=self.token_auth_header(student_token))
+                status_codes.append(rv.status_code)
+            def before_execute(conn, cursor, statement, parameters, context, executemany):
+                if statement.startswith(prefix) and not fired:
+                    fired.append(statement)
+                    thread = Thread(target=student_request)
+                    thread.start()
+                    thread.join()
+            fired = []
+            event.listen(db.engine, 'before_cursor_execute', before_execute)
+            try:
+                rv = self.client.put(f'/api/v1/teacher/homework/{homework_id}', headers=self.token_auth_header(teacher_token),
+                                     data=json.dumps({'students': students}))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', before_execute)
+            db.session.expire_all()
+            return status_codes + [rv.status_code], Homework.query.get(homework_id)
+
+        # the student leaves while the teacher removes them
+        status_codes, homework = teacher_request({'remove': [self.student.id]}, 'DELETE FROM students_homeworks', 'DELETE')
+        self.assertEquals(status_codes, [200, 200])
+        self.assertEquals((homework.assigned_count, len(homework.students)), (0, 0))
+
+        # the student signs up while the teacher adds them
+        status_codes, homework = teacher_request({'add': [self.student.id]}, 'INSERT INTO students_homeworks', 'POST')
+        self.assertEquals(status_codes, [200, 200])
+        self.assertEquals((homework.assigned_count, len(homework.students)), (1, 1))
@@ -1,10 +1,10 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 
 from tests import BaseApiTest
 
 from homework_server import db
-from homework_server.models import Course, Homework, Solution, Teacher
+from homework_server.models import Course, Homework, Solution, Student, Teacher
 
 class TeacherApiTest(BaseApiTest):
     def test_get_courses(self):
@@ -279,6 +279,105 @@ class TeacherApiTest(BaseApiTest):
                                  headers=self.token_auth_header(token), data=json.dumps(d))
             self.assertEquals(rv.status_code, 200)
 
+    def test_assign_students(self):
+        # create a course
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.commit()
+
+        # create a homework
+        homework = Homework()
+        homework.from_dict({
+            'name': 'homework',
+            'description': 'homework',
+            'deadline': '2018-11-08 08:48:11',
+            'headcount': 4,
+            'self_assignable': False
+        })
+        homework.course_id = course.id
+        db.session.add(homework)
+        db.session.commit()
+
+        # create more students
+        students = [self.student]
+        for i in range(3):
+            student = Student()
+            student.from_dict({
+                'name': f's{i}',
+                'username': f's{i}'
+            })
+            student.password_hash = self.student.password_hash
+            db.session.add(student)
+            students.append(student)
+        db.session.commit()
+        ids = [student.id for student in students]
+
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('teacher', 'teacher'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # replace with a list, duplicates are ignored
+        rv = self.client.put(f'/api/v1/teacher/homework/{homework.id}', headers=self.token_auth_header(token), \
+                             data=json.dumps({'students': [ids[0], ids[1], ids[1]]}))
+        self.assertEquals(rv.status_code, 200)
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['students'], {'added': ids[:2], 'removed': []})
+        homework = Homework.query.filter_by(name='homework').first()
+        self.assertEquals(sorted(student.id for student in homework.students), ids[:2])
+
+        # add and remove
+        rv = self.client.put(f'/api/v1/teacher/homework/{homework.id}', headers=self.token_auth_header(token), \
+                             data=json.dumps({'students': {'add': [ids[2], ids[3]], 'remove': [ids[0]]}}))
+        self.assertEquals(rv.status_code, 200)
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['students'], {'added': ids[2:], 'removed': [ids[0]]})
+        homework = Homework.query.filter_by(name='homework').first()
+        self.assertEquals(sorted(student.id for student in homework.students), ids[1:])
+
+        # unknown and invalid ids are reported and nothing is changed
+        rv = self.client.put(f'/api/v1/teacher/homework/{homework.id}', headers=self.token_auth_header(token), \
+                             data=json.dumps({'name': 'f1', 'students': {'set': [ids[0], 1000, 'x']}}))
+        self.assertEquals(rv.status_code, 400)
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['errors'], {'1000': 'unknown student', 'x': 'invalid id'})
+        homework = Homework.query.filter_by(name='homework').first()
+        self.assertIsNotNone(homework)
+        self.assertEquals(sorted(student.id for student in homework.students), ids[1:])
+
+        # replace with an empty list
+        rv = self.client.put(f'/api/v1/teacher/homework/{homework.id}', headers=self.token_auth_header(token), \
+                             data=json.dumps({'students': []}))
+        self.assertEquals(rv.status_code, 200)
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['students'], {'added': [], 'removed': ids[1:]})
+        homework = Homework.query.filter_by(name='homework').first()
+        self.assertEquals(len(homework.students), 0)
+
+        # lowering the headcount below the assigned students still allows removing them
+        rv = self.client.put(f'/api/v1/teacher/homework/{homework.id}', headers=self.token_auth_header(token), \
+                             data=json.dumps({'students': ids}))
+        self.assertEquals(rv.status_code, 200)
+        rv = self.client.put(f'/api/v1/teacher/homework/{homework.id}', headers=self.token_auth_header(token), \
+                             data=json.dumps({'headcount': 2}))
+        self.assertEquals(rv.status_code, 200)
+        rv = self.client.put(f'/api/v1/teacher/homework/{homework.id}', headers=self.token_auth_header(token), \
+                             data=json.dumps({'students': {'remove': [ids[0]]}}))
+        self.assertEquals(rv.status_code, 200)
+        homework = Homework.query.filter_by(name='homework').first()
+        self.assertEquals(homework.assigned_count, 3)
+
+        # but adding to an over-full homework is refused
+        rv = self.client.put(f'/api/v1/teacher/homework/{homework.id}', headers=self.token_auth_header(token), \
+                             data=json.dumps({'students': {'add': [ids[0]]}}))
+        self.assertEquals(rv.status_code, 400)
+        self.assertEquals(json.loads(rv.data.decode())['errors'], {'students': 'headcount exceeded'})
+
     def test_remove_homework(self):
         # create a homework
         course = Course()
@@ -359,6 +458,230 @@ class TeacherApiTest(BaseApiTest):
         self.assertEquals(data['students'][0]['name'], 'student')
         self.assertEquals(data['students'][0]['username'], 'student')
 
+    def test_get_students_of_course(self):
+        # create two courses with different students
+        other = Student()
+        other.from_dict({
+            'name': 'other',
+            'username': 'other'
+        })
+        other.password_hash = self.student.password_hash
+        courses = []
+        for name, student in [('course', self.student), ('other course', other)]:
+            course = Course()
+            course.from_dict({
+                'name': name,
+                'description': name
+            })
+            course.teacher_id = self.teacher.id
+            course.students.append(student)
+            db.session.add(course)
+            courses.append(course)
+        db.session.commit()
+
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('teacher', 'teacher'))
+        token = json.loads(rv.data.decode())['token']
+
+        # each course lists only its own students
+        for course, username in zip(courses, ['student', 'other']):
+            rv = self.client.get(f'/api/v1/teacher/course/{course.id}/students', headers=self.token_auth_header(token))
+            self.assertEquals(rv.status_code, 200)
+            data = json.loads(rv.data.decode())
+            self.assertEquals([student['username'] for student in data['students']], [username])
+
+    def test_enroll_students(self):
+        # create a course
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        course.students.append(self.student)
+        db.session.add(course)
+        db.session.commit()
+
+        # create more students
+        for i in range(2):
+            student = Student()
+            student.from_dict({
+                'name': f's{i}',
+                'username': f's{i}'
+            })
+            student.password_hash = self.student.password_hash
+            db.session.add(student)
+        db.session.commit()
+        s0 = Student.query.filter_by(username='s0').first()
+
+        # try to access with basic authentication
+        rv = self.client.post(f'/api/v1/teacher/course/{course.id}/students', headers=self.basic_auth_header('teacher', 'teacher'), \
+                              data=json.dumps({'students': [s0.id]}))
+        self.assertEquals(rv.status_code, 401)
+
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('teacher', 'teacher'))
+        self.assertEquals(rv.status_code, 200)
+        token = json.loads(rv.data.decode())['token']
+
+        # access with token, mixing ids and usernames
+        rv = self.client.post(f'/api/v1/teacher/course/{course.id}/students', headers=self.token_auth_header(token), \
+                              data=json.dumps({'students': [s0.id, 's0', 's1', 'student', 'teacher', 1000]}))
+        self.assertEquals(rv.status_code, 200)
+
+        # check returned data
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['added'], 2)
+        self.assertEquals(data['existing'], 1)
+        self.assertEquals(data['unknown'], 2)
+        self.assertEquals(data['unknown_students'], ['teacher', 1000])
+
+        # check data
+        course = Course.query.filter_by(name='course').first()
+        self.assertEquals(sorted(student.username for student in course.students), ['s0', 's1', 'student'])
+
+        # enrolling again adds nothing
+        rv = self.client.post(f'/api/v1/teacher/course/{course.id}/students', headers=self.token_auth_header(token), \
+                              data=json.dumps(['s0', 's1']))
+        self.assertEquals(rv.status_code, 200)
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['added'], 0)
+        self.assertEquals(data['existing'], 2)
+
+        # try to enroll without a list
+        rv = self.client.post(f'/api/v1/teacher/course/{course.id}/students', headers=self.token_auth_header(token), \
+                              data=json.dumps({'students': 's0'}))
+        self.assertEquals(rv.status_code, 400)
+
+        # try to enroll into a nonexistent course
+        rv = self.client.post(f'/api/v1/teacher/course/1000/students', headers=self.token_auth_header(token), \
+                              data=json.dumps(['s0']))
+        self.assertEquals(rv.status_code, 410)
+
+    def test_get_upcoming_homeworks(self):
+        other_teacher = Teacher()
+        other_teacher.from_dict({
+            'name': 'other',
+            'username': 'other',
+            'password': 'other'
+        })
+        db.session.add(other_teacher)
+        db.session.commit()
+
+        # create homeworks in courses of two teachers
+        now = datetime.utcnow()
+        for i, teacher in enumerate([self.teacher, self.teacher, other_teacher]):
+            course = Course()
+            course.from_dict({
+                'name': f'course{i}',
+                'description': 'course'
+            })
+            course.teacher_id = teacher.id
+            db.session.add(course)
+            db.session.commit()
+            for j in range(2):
+                homework = Homework()
+                homework.from_dict({
+                    'name': f'homework{i}{j}',
+                    'description': 'homework',
+                    'deadline': now + timedelta(hours=10 * j + i + 1),
+                    'headcount': 4,
+                    'self_assignable': False
+                })
+                homework.course_id = course.id
+                db.session.add(homework)
+        db.session.commit()
+
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('teacher', 'teacher'))
+        token = json.loads(rv.data.decode())['token']
+
+        # homeworks of the teacher's courses come by deadline
+        rv = self.client.get('/api/v1/teacher/homeworks/upcoming?within=1&limit=3', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        data = json.loads(rv.data.decode())
+        self.assertEquals([homework['name'] for homework in data['homeworks']], ['homework00', 'homework10', 'homework01'])
+        rv = self.client.get(data['next'], headers=self.token_auth_header(token))
+        data = json.loads(rv.data.decode())
+        self.assertEquals([homework['name'] for homework in data['homeworks']], ['homework11'])
+        self.assertIsNone(data['next'])
+
+    def test_get_summary(self):
+        # create a course with two homeworks
+        course = Course()
+        course.from_dict({
+            'name': 'course',
+            'description': 'course'
+        })
+        course.teacher_id = self.teacher.id
+        db.session.add(course)
+        db.session.commit()
+        homeworks = []
+        for name, deadline in [('later', '2018-11-09 08:48:11'), ('sooner', '2018-11-08 08:48:11')]:
+            homework = Homework()
+            homework.from_dict({
+                'name': name,
+                'description': 'homework',
+                'deadline': deadline,
+                'headcount': 4,
+                'self_assignable': False
+            })
+            homework.course_id = course.id
+            homework.students.append(self.student)
+            db.session.add(homework)
+            homeworks.append(homework)
+        db.session.commit()
+
+        # the student submits twice, one solution is graded
+        for status, submitted_at in [('', datetime(2018, 11, 7)), ('passed', datetime(2018, 11, 8))]:
+            solution = Solution()
+            solution.from_dict({
+                'status': status
+            })
+            solution.file_path = 'f'
+            solution.homework_id = homeworks[1].id
+            solution.student_id = self.student.id
+            solution.submitted_at = submitted_at
+            db.session.add(solution)
+        db.session.commit()
+
+        # get token
+        rv = self.client.post('/api/v1/auth/token', headers=self.basic_auth_header('teacher', 'teacher'))
+        token = json.loads(rv.data.decode())['token']
+
+        # check returned data
+        rv = self.client.get(f'/api/v1/teacher/course/{course.id}/summary', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 200)
+        self.assertEquals(rv.headers['X-Cache'], 'MISS')
+        data = json.loads(rv.data.decode())
+        self.assertEquals(data['course'], 'course')
+        self.assertEquals([homework['name'] for homework in data['homeworks']], ['sooner', 'later'])
+        self.assertEquals(data['homeworks'][0], {
+            'id': homeworks[1].id,
+            'name': 'sooner',
+            'deadline': '2018-11-08 08:48:11',
+            'assigned': 1,
+            'submitted': 1,
+            'solutions': 2,
+            'by_status': {'': 1, 'passed': 1},
+            'latest_submission': '2018-11-08 00:00:00'
+        })
+        self.assertEquals((data['homeworks'][1]['submitted'], data['homeworks'][1]['by_status'],
+                           data['homeworks'][1]['latest_submission']), (0, {}, None))
+
+        # grading invalidates the cached summary
+        rv = self.client.get(f'/api/v1/teacher/course/{course.id}/summary', headers=self.token_auth_header(token))
+        self.assertEquals(rv.headers['X-Cache'], 'HIT')
+        solution = Solution.query.filter_by(status='').first()
+        rv = self.client.put(f'/api/v1/teacher/solution/{solution.id}', headers=self.token_auth_header(token),
+                             data=json.dumps({'status': 'failed'}))
+        rv = self.client.get(f'/api/v1/teacher/course/{course.id}/summary', headers=self.token_auth_header(token))
+        self.assertEquals(rv.headers['X-Cache'], 'MISS')
+        self.assertEquals(json.loads(rv.data.decode())['homeworks'][0]['by_status'], {'failed': 1, 'passed': 1})
+
+        # removed courses have no summary
+        rv = self.client.get('/api/v1/teacher/course/0/summary', headers=self.token_auth_header(token))
+        self.assertEquals(rv.status_code, 410)
+
     def test_get_solutions(self):
         # create a homework
         course = Course()